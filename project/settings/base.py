@@ -158,3 +158,8 @@ RT_SITE_INFO = {
 }
 
 RT_CACHE_TIMEOUT = 3600
+
+# Race archive
+
+RT_ARCHIVE_ROOT = os.path.join(BASE_DIR, 'archive')
+RT_SITE_URL = 'http://localhost:8000'
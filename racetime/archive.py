@@ -0,0 +1,136 @@
+"""
+Static archive for finished races.
+
+Once a race is done and can no longer change, its page, data and chat log
+are written to a content-addressed file store under RT_ARCHIVE_ROOT. Files
+are named by the SHA-256 hash of their contents, and a small index file per
+race maps each archived segment to its file:
+
+    <root>/objects/ab/abcdef...
+    <root>/races/<category>/<race>.json
+
+Archived segments are served straight from disk, without touching the
+database, and with long-lived cache headers.
+"""
+import hashlib
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag
+
+__all__ = [
+    'ARCHIVE_MAX_AGE',
+    'SEGMENTS',
+    'read_index',
+    'serve',
+    'write_race',
+]
+
+# How long clients and proxies may cache archived content for.
+ARCHIVE_MAX_AGE = timedelta(days=365)
+
+# Archived segments and their content types.
+SEGMENTS = {
+    'page': 'text/html; charset=utf-8',
+    'data': 'application/json',
+    'renders': 'application/json',
+    'state': 'application/json',
+    'chat': 'application/json',
+}
+
+
+def _index_path(category_slug, race_slug):
+    return os.path.join(
+        settings.RT_ARCHIVE_ROOT,
+        'races',
+        os.path.basename(category_slug),
+        os.path.basename(race_slug) + '.json',
+    )
+
+
+def _object_path(digest):
+    return os.path.join(settings.RT_ARCHIVE_ROOT, 'objects', digest[:2], digest)
+
+
+def _write_file(path, content):
+    """
+    Write a file atomically, so readers never see partial content.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def store(content):
+    """
+    Store the given bytes in the archive and return their hash.
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        _write_file(path, content)
+    return digest
+
+
+def read_index(category_slug, race_slug):
+    """
+    Return the archive index for a race as a dict of segment name to content
+    hash, or None if the race has not been archived.
+    """
+    try:
+        with open(_index_path(category_slug, race_slug)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_race(category_slug, race_slug, segments):
+    """
+    Archive a race. The segments argument should be a dict of segment name
+    (see SEGMENTS) to content, as a string.
+    """
+    index = {
+        segment: store(content.encode())
+        for segment, content in segments.items()
+    }
+    _write_file(
+        _index_path(category_slug, race_slug),
+        json.dumps(index).encode(),
+    )
+    return index
+
+
+def serve(request, category_slug, race_slug, segment):
+    """
+    Return an HttpResponse for an archived race segment, or None if the race
+    (or that segment of it) has not been archived.
+    """
+    index = read_index(category_slug, race_slug)
+    if not index or segment not in index:
+        return None
+
+    digest = index[segment]
+    etag = quote_etag(digest)
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        resp = HttpResponseNotModified()
+    else:
+        try:
+            with open(_object_path(digest), 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        resp = HttpResponse(content=content, content_type=SEGMENTS[segment])
+
+    resp['ETag'] = etag
+    patch_cache_control(
+        resp,
+        public=True,
+        max_age=int(ARCHIVE_MAX_AGE.total_seconds()),
+    )
+    return resp
@@ -7,11 +7,53 @@ from django import forms
 from django.contrib.auth import forms as auth_forms
 from django.core.exceptions import ValidationError
 from django.core.mail import send_mail
+from django.db.models import Q
 from django.template.loader import render_to_string
 
 from . import models
 
 
+def split_full_name(username):
+    """
+    Split a "name#discriminator" string into its two parts. A name given
+    without a discriminator is assumed to have none (0000).
+    """
+    if '#' in username:
+        name, scrim = username.rsplit('#', 1)
+    else:
+        name = username
+        scrim = '0000'
+    return name, scrim
+
+
+def find_users(full_names):
+    """
+    Return a dict of the users with the given "name#discriminator" strings,
+    keyed by those strings and found with a single query. Raises
+    ValidationError listing any names that do not match a user.
+    """
+    names = {}
+    query = Q()
+    for full_name in full_names:
+        name, scrim = split_full_name(full_name)
+        names[(name, scrim)] = full_name
+        query |= Q(name=name, discriminator=scrim)
+
+    users = {
+        (user.name, user.discriminator): user
+        for user in models.User.objects.filter(query).exclude(
+            email=models.User.SYSTEM_USER,
+        )
+    } if names else {}
+    missing = [full_name for key, full_name in names.items() if key not in users]
+    if missing:
+        raise ValidationError(
+            'Could not find users by these names: %(names)s'
+            % {'names': ', '.join(missing)}
+        )
+    return {full_name: users[key] for key, full_name in names.items()}
+
+
 class ChatForm(forms.ModelForm):
     class Meta:
         fields = ('message',)
@@ -35,12 +77,7 @@ class InviteForm(forms.ModelForm):
         model = models.Entrant
 
     def clean_user(self):
-        username = self.cleaned_data.get('user', '')
-        if '#' in username:
-            name, scrim = username.split('#')
-        else:
-            name = username
-            scrim = '0000'
+        name, scrim = split_full_name(self.cleaned_data.get('user', ''))
 
         try:
             return models.User.objects.filter(
@@ -51,6 +88,31 @@ class InviteForm(forms.ModelForm):
             raise ValidationError('Could not find a user by that name.')
 
 
+class BulkInviteForm(forms.Form):
+    max_users = 100
+
+    users = forms.CharField(
+        widget=forms.Textarea(attrs={'placeholder': 'One name#1234 per line…'}),
+    )
+
+    def clean_users(self):
+        """
+        Return the list of users named, found with a single query.
+        """
+        full_names = list(dict.fromkeys(
+            line.strip()
+            for line in self.cleaned_data.get('users', '').splitlines()
+            if line.strip()
+        ))
+        if len(full_names) > self.max_users:
+            raise ValidationError(
+                'You can invite up to %(max)d users at once.'
+                % {'max': self.max_users}
+            )
+
+        return list(find_users(full_names).values())
+
+
 class CategoryForm(forms.ModelForm):
     active_goals = forms.ModelMultipleChoiceField(
         queryset=models.Goal.objects.get_queryset(),
@@ -260,6 +322,68 @@ class RaceCreationForm(RaceForm):
         model = models.Race
 
 
+class RaceBatchForm(RaceCreationForm):
+    max_rooms = 50
+    max_users = 100
+
+    rooms = forms.CharField(
+        widget=forms.Textarea(attrs={
+            'placeholder': 'name#1234, name#5678\nname#4321, name#8765',
+        }),
+        help_text=(
+            'One line per race room, listing the users to invite to that '
+            'room separated by commas. Every room uses the race details '
+            'above.'
+        ),
+    )
+    monitors = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'placeholder': 'One name#1234 per line…'}),
+        help_text='Users to promote to race monitor in every room.',
+    )
+
+    def clean(self):
+        """
+        Resolve the users named in rooms and monitors, all with a single
+        query.
+        """
+        cleaned_data = super().clean()
+
+        rooms = [
+            list(dict.fromkeys(
+                name.strip() for name in line.split(',') if name.strip()
+            ))
+            for line in cleaned_data.get('rooms', '').splitlines()
+            if line.strip()
+        ]
+        monitors = list(dict.fromkeys(
+            line.strip()
+            for line in cleaned_data.get('monitors', '').splitlines()
+            if line.strip()
+        ))
+        if len(rooms) > self.max_rooms:
+            raise ValidationError(
+                'You can open up to %(max)d race rooms at once.'
+                % {'max': self.max_rooms}
+            )
+        if sum(len(names) for names in rooms) + len(monitors) > self.max_users:
+            raise ValidationError(
+                'You can name up to %(max)d users at once.'
+                % {'max': self.max_users}
+            )
+
+        users = find_users(list(dict.fromkeys(
+            name for names in rooms + [monitors] for name in names
+        )))
+        cleaned_data['rooms'] = [
+            [users[name] for name in names]
+            for names in rooms
+        ]
+        cleaned_data['monitors'] = [users[name] for name in monitors]
+
+        return cleaned_data
+
+
 class RaceEditForm(RaceForm):
     class Meta:
         fields = (
@@ -0,0 +1,95 @@
+import json
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.test import RequestFactory
+from django.utils import timezone
+
+from ... import archive, models, views
+
+
+class Command(BaseCommand):
+    help = (
+        'Write a static snapshot of every race that can no longer change to '
+        'the race archive. Archived races are served from disk from then on.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='Maximum number of races to archive in one run.',
+        )
+
+    def handle(self, *args, **options):
+        queryset = models.Race.objects.filter(
+            archived_at__isnull=True,
+            state__in=[
+                models.RaceStates.finished.value,
+                models.RaceStates.cancelled.value,
+            ],
+        ).filter(
+            Q(recorded=True) | Q(recordable=False),
+        ).filter(
+            Q(ended_at__isnull=True)
+            | Q(ended_at__lte=timezone.now() - models.Race.CHAT_WINDOW),
+        ).select_related('category').order_by('id')
+
+        count = 0
+        for race in queryset[:options['limit']]:
+            if not race.is_frozen:
+                continue
+            archive.write_race(race.category.slug, race.slug, {
+                'page': self.render_page(race),
+                'data': race.json_data,
+                'renders': race.json_renders,
+                'state': json.dumps(race.json_state, cls=DjangoJSONEncoder),
+                'chat': self.dump_chat(race),
+            })
+            models.Race.objects.filter(id=race.id).update(
+                archived_at=timezone.now(),
+                version=F('version') + 1,
+            )
+            count += 1
+
+        self.stdout.write('Archived %(count)d race(s).' % {'count': count})
+
+    def render_page(self, race):
+        """
+        Render the race page as an anonymous user would see it.
+        """
+        site_url = urlparse(settings.RT_SITE_URL)
+        request = RequestFactory().get(
+            race.get_absolute_url(),
+            secure=site_url.scheme == 'https',
+            HTTP_HOST=site_url.netloc,
+        )
+        request.user = AnonymousUser()
+
+        response = views.Race.as_view()(
+            request,
+            category=race.category.slug,
+            race=race.slug,
+        )
+        response.render()
+        return response.content.decode()
+
+    def dump_chat(self, race):
+        """
+        Return the full public chat log for the race, in the same format as
+        the race chat endpoint.
+        """
+        return json.dumps({
+            'messages': [
+                message.api_dict_summary(race=race)
+                for message in race.message_set.filter(
+                    deleted=False,
+                ).select_related('user').order_by('posted_at')
+            ],
+            'start': None,
+            'end': timezone.now(),
+            'tick_rate': race.tick_rate,
+        }, cls=DjangoJSONEncoder)
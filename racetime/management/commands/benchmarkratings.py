@@ -0,0 +1,56 @@
+import random
+import time
+
+from django.core.management import BaseCommand
+
+from ... import ratings
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure rating engine throughput by replaying synthetic race '
+        'results. Does not touch the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--results', type=int, default=1000000,
+            help='Total number of entrant results to replay.',
+        )
+        parser.add_argument(
+            '--race-size', type=int, default=8,
+            help='Number of entrants in each race.',
+        )
+        parser.add_argument(
+            '--users', type=int, default=20000,
+            help='Number of distinct users to draw entrants from.',
+        )
+
+    def handle(self, *args, **options):
+        race_size = options['race_size']
+        users = options['users']
+        rng = random.Random(0)
+
+        races = []
+        for _ in range(options['results'] // race_size):
+            entrants = rng.sample(range(users), race_size)
+            races.append((entrants, ratings.rank_results([
+                (place, rng.random() > 0.1)
+                for place in range(1, race_size + 1)
+            ])))
+
+        start = time.perf_counter()
+        ratings.replay(races, users)
+        elapsed = time.perf_counter() - start
+
+        results = len(races) * race_size
+        self.stdout.write(
+            'Replayed %(results)d results in %(races)d races in %(elapsed).2fs '
+            '(%(rate)d results/s, %(engine)s).' % {
+                'results': results,
+                'races': len(races),
+                'elapsed': elapsed,
+                'rate': results / elapsed,
+                'engine': 'NumPy' if ratings.numpy else 'pure Python',
+            }
+        )
@@ -0,0 +1,25 @@
+from django.core.management import BaseCommand
+
+from ... import models
+
+
+class Command(BaseCommand):
+    help = 'Rebuild category leaderboards from all recorded races.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'categories', nargs='*', metavar='category',
+            help='Slugs of the categories to rebuild (default: all).',
+        )
+
+    def handle(self, *args, **options):
+        goals = models.Goal.objects.select_related('category')
+        if options['categories']:
+            goals = goals.filter(category__slug__in=options['categories'])
+
+        for goal in goals.order_by('category__slug', 'name'):
+            models.LeaderboardEntry.objects.update_for(goal)
+            self.stdout.write('Rebuilt %(category)s: %(goal)s' % {
+                'category': goal.category.slug,
+                'goal': goal.name,
+            })
@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+
+from ... import models, ratings
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalculate skill ratings by replaying all recorded races in the '
+        'order they finished.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'categories', nargs='*', metavar='category',
+            help='Slugs of the categories to rebuild (default: all).',
+        )
+
+    def handle(self, *args, **options):
+        if not ratings.numpy:
+            self.stderr.write(
+                'NumPy is not installed, ratings will be calculated one race '
+                'at a time.'
+            )
+
+        goals = models.Goal.objects.select_related('category')
+        if options['categories']:
+            goals = goals.filter(category__slug__in=options['categories'])
+
+        for goal in goals.order_by('category__slug', 'name'):
+            count = models.Rating.objects.rebuild(goal)
+            self.stdout.write('Rebuilt %(category)s: %(goal)s (%(count)d races)' % {
+                'category': goal.category.slug,
+                'goal': goal.name,
+                'count': count,
+            })
@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import BaseCommand
+from django.db.models import Count, Q
+
+from ... import models
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount the current and total races for each category, correcting '
+        'any drift in the stored race counters.'
+    )
+
+    def handle(self, *args, **options):
+        categories = models.Category.objects.annotate(
+            actual_current_race_count=Count(
+                'race__id',
+                filter=Q(race__state__in=[
+                    state.value for state in models.RaceStates.current
+                ]),
+            ),
+            actual_total_race_count=Count('race__id'),
+        )
+
+        count = 0
+        for category in categories:
+            if (
+                category.current_race_count == category.actual_current_race_count
+                and category.total_race_count == category.actual_total_race_count
+            ):
+                continue
+            models.Category.objects.filter(id=category.id).update(
+                current_race_count=category.actual_current_race_count,
+                total_race_count=category.actual_total_race_count,
+            )
+            self.stdout.write(
+                '%(category)s: %(current)d/%(total)d -> %(actual_current)d/%(actual_total)d' % {
+                    'category': category.slug,
+                    'current': category.current_race_count,
+                    'total': category.total_race_count,
+                    'actual_current': category.actual_current_race_count,
+                    'actual_total': category.actual_total_race_count,
+                }
+            )
+            count += 1
+
+        if count:
+            cache.delete(make_template_fragment_key('home_categories'))
+        self.stdout.write('Corrected %(count)d category(s).' % {'count': count})
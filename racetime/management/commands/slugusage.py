@@ -0,0 +1,24 @@
+from django.core.management import BaseCommand
+
+from ... import models
+
+
+class Command(BaseCommand):
+    help = (
+        'Report how much of each category\'s race slug namespace is used, '
+        'most used first.'
+    )
+
+    def handle(self, *args, **options):
+        categories = sorted(
+            models.Category.objects.all(),
+            key=lambda category: category.slug_usage(),
+            reverse=True,
+        )
+        for category in categories:
+            self.stdout.write('%(category)s: %(usage).4f%% (%(races)d races%(words)s)' % {
+                'category': category.slug,
+                'usage': category.slug_usage() * 100,
+                'races': category.total_race_count,
+                'words': ', custom slug words' if category.slug_words else '',
+            })
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-19 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racetime', '0003_auto_20200111_1005'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='race',
+            name='archived_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
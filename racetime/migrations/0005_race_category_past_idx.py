@@ -0,0 +1,17 @@
+# Generated by Django 3.0.14 on 2026-10-19 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racetime', '0004_race_archived_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='race',
+            index=models.Index(fields=['category', 'state', '-ended_at', '-id'], name='race_category_past_idx'),
+        ),
+    ]
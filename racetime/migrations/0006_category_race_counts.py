@@ -0,0 +1,49 @@
+# Generated by Django 3.0.14 on 2026-10-19 07:56
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_races(apps, schema_editor):
+    """
+    Populate the race counters for existing categories.
+    """
+    Category = apps.get_model('racetime', 'Category')
+    current_states = ['open', 'invitational', 'pending', 'in_progress']
+
+    for category in Category.objects.annotate(
+        actual_current_race_count=Count(
+            'race__id',
+            filter=Q(race__state__in=current_states),
+        ),
+        actual_total_race_count=Count('race__id'),
+    ):
+        Category.objects.filter(id=category.id).update(
+            current_race_count=category.actual_current_race_count,
+            total_race_count=category.actual_total_race_count,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racetime', '0005_race_category_past_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='current_race_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='total_race_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['-current_race_count', '-total_race_count', 'name'], name='category_race_count_idx'),
+        ),
+        migrations.RunPython(count_races, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.0.14 on 2026-10-19 07:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racetime', '0006_category_race_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('best_time', models.DurationField(null=True)),
+                ('median_time', models.DurationField(null=True)),
+                ('times_raced', models.PositiveIntegerField(default=0)),
+                ('times_finished', models.PositiveIntegerField(default=0)),
+                ('first_places', models.PositiveIntegerField(default=0)),
+                ('second_places', models.PositiveIntegerField(default=0)),
+                ('third_places', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='racetime.Category')),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='racetime.Goal')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['goal', 'best_time'], name='leaderboard_goal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['user', 'category'], name='leaderboard_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('goal', 'user'), name='unique_goal_user'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.0.14 on 2026-10-19 08:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racetime', '0007_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating_before', models.FloatField()),
+                ('rating_after', models.FloatField()),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='racetime.Goal')),
+                ('race', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='racetime.Race')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Rating',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.FloatField(default=1500.0)),
+                ('races', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='racetime.Category')),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='racetime.Goal')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ratingchange',
+            index=models.Index(fields=['user', 'goal', 'race'], name='rating_change_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['goal', '-rating'], name='rating_goal_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('goal', 'user'), name='unique_rating_goal_user'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.0.14 on 2026-10-19 08:10
+
+import random
+
+from django.db import migrations, models
+
+
+def reassign_duplicates(apps, schema_editor):
+    """
+    Give a new discriminator to any user whose name and discriminator are
+    shared with an earlier user, so the unique constraint can be added.
+    """
+    User = apps.get_model('racetime', 'User')
+    taken = {}
+    for user_id, name, discriminator in User.objects.order_by('id').values_list(
+        'id', 'name', 'discriminator',
+    ):
+        used = taken.setdefault(name, set())
+        if discriminator in used:
+            discriminator = random.choice([
+                scrim
+                for scrim in ('%04d' % i for i in range(1, 9999))
+                if scrim not in used
+            ])
+            User.objects.filter(id=user_id).update(discriminator=discriminator)
+        used.add(discriminator)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racetime', '0008_rating'),
+    ]
+
+    operations = [
+        migrations.RunPython(reassign_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(fields=('name', 'discriminator'), name='unique_name_discriminator'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.0.14 on 2026-10-19 08:14
+
+from django.conf import settings
+from django.db import migrations, models
+from hashids import Hashids
+
+
+def backfill_hashids(apps, schema_editor):
+    """
+    Store the hashid for every existing user and message.
+
+    Hashids are salted with the name of the real model class (see
+    racetime.utils.get_hashids), which historical models do not share, so
+    the salts are given here in full.
+    """
+    for model_name, class_name in [
+        ('User', 'racetime.models.user.User'),
+        ('Message', 'racetime.models.chat.Message'),
+    ]:
+        model = apps.get_model('racetime', model_name)
+        hashids = Hashids(
+            salt="<class '%s'>" % class_name + settings.SECRET_KEY,
+            min_length=16,
+        )
+        batch = []
+        for obj in model.objects.filter(hashid__isnull=True).only('id').iterator():
+            obj.hashid = hashids.encode(obj.id)
+            batch.append(obj)
+            if len(batch) >= 1000:
+                model.objects.bulk_update(batch, ['hashid'])
+                batch = []
+        model.objects.bulk_update(batch, ['hashid'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racetime', '0009_user_unique_name_discriminator'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='hashid',
+            field=models.CharField(editable=False, max_length=32, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='hashid',
+            field=models.CharField(editable=False, max_length=32, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_hashids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.14 on 2026-10-19 08:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('racetime', '0010_hashid_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entrant',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='race',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from .category import Category, CategoryRequest, Goal
 from .chat import Message
 from .choices import EntrantStates, RaceStates
+from .leaderboard import LeaderboardEntry
 from .race import Entrant, Race
+from .rating import Rating, RatingChange
 from .user import Ban, User, UserLog
 
 __all__ = [
@@ -14,9 +16,14 @@ __all__ = [
     # choices
     'EntrantStates',
     'RaceStates',
+    # leaderboard
+    'LeaderboardEntry',
     # race
     'Entrant',
     'Race',
+    # rating
+    'Rating',
+    'RatingChange',
     # user
     'Ban',
     'User',
@@ -1,16 +1,23 @@
-import json
 from functools import partial
 
 from django.conf import settings
 from django.core.cache import cache
-from django.core.serializers.json import DjangoJSONEncoder
+from django.core.cache.utils import make_template_fragment_key
 from django.db import models
 from django.db.transaction import atomic
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.functional import cached_property
 
-from .choices import RaceStates
-from ..utils import SafeException, generate_race_slug
+from ..permissions import PermissionSnapshot
+from ..serializers import dump_category_data
+from ..stats import dump_goal_stats
+from ..utils import (
+    SafeException,
+    cache_payload,
+    generate_race_slug,
+    race_slug_space,
+)
 
 
 class Category(models.Model):
@@ -82,6 +89,27 @@ class Category(models.Model):
     updated_at = models.DateTimeField(
         auto_now=True,
     )
+    current_race_count = models.IntegerField(
+        default=0,
+        editable=False,
+    )
+    total_race_count = models.IntegerField(
+        default=0,
+        editable=False,
+    )
+
+    RACE_COUNT_FIELDS = ('current_race_count', 'total_race_count')
+    # How many race slug candidates to check at once, and how many times.
+    SLUG_BATCH_SIZE = 50
+    SLUG_BATCHES = 4
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-current_race_count', '-total_race_count', 'name'],
+                name='category_race_count_idx',
+            ),
+        ]
 
     @property
     def json_data(self):
@@ -94,6 +122,13 @@ class Category(models.Model):
             settings.RT_CACHE_TIMEOUT,
         )
 
+    @cached_property
+    def permissions(self):
+        """
+        Return a PermissionSnapshot for this category.
+        """
+        return PermissionSnapshot(self)
+
     @property
     def moderator_list(self):
         """
@@ -101,6 +136,37 @@ class Category(models.Model):
         """
         return ', '.join(str(user) for user in self.moderators.all())
 
+    def adjust_race_counts(self, current=0, total=0):
+        """
+        Add the given amounts to this category's race counters.
+
+        The counters are updated in the database rather than on this object,
+        so that concurrent updates do not overwrite each other.
+        """
+        Category.objects.filter(id=self.id).update(
+            current_race_count=models.F('current_race_count') + current,
+            total_race_count=models.F('total_race_count') + total,
+        )
+        cache.delete(make_template_fragment_key('home_categories'))
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or kwargs.get('force_insert'):
+            super().save(*args, **kwargs)
+            return
+
+        # The race counters are only changed by adjust_race_counts and the
+        # reconcileracecounts command. Leave them out of other saves, so a
+        # copy loaded earlier cannot overwrite races counted since.
+        update_fields = kwargs.pop('update_fields', None)
+        if update_fields is None:
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.RACE_COUNT_FIELDS
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
     def api_dict_summary(self):
         return {
             'name': self.name,
@@ -111,62 +177,34 @@ class Category(models.Model):
         }
 
     def can_edit(self, user):
-        return user.is_active and (user.is_superuser or user == self.owner)
+        return self.permissions.can_edit(user)
 
     def can_moderate(self, user):
         """
         Determine if the given user can moderate this category.
         """
-        return user.is_active and (
-            user.is_superuser
-            or user == self.owner
-            or user in self.moderators.all()
-        )
+        return self.permissions.can_moderate(user)
 
     def can_start_race(self, user):
-        return self.active and user.is_active and not user.is_banned_from_category(self)
+        return (
+            self.active
+            and self.permissions.is_active(user)
+            and not self.permissions.is_banned_from_category(user)
+        )
 
     def dump_json_data(self):
-        value = json.dumps({
-            **self.api_dict_summary(),
-            'image': self.image.url if self.image else None,
-            'info': self.info,
-            'streaming_required': self.streaming_required,
-            'owner': self.owner.api_dict_summary(category=self),
-            'moderators': [user.api_dict_summary(category=self) for user in self.moderators.all()],
-            'current_races': [
-                {
-                    'name': str(race),
-                    'status': {
-                        'value': race.state_info.value,
-                        'verbose_value': race.state_info.verbose_value,
-                        'help_text': race.state_info.help_text,
-                    },
-                    'url': race.get_absolute_url(),
-                    'data_url': race.get_data_url(),
-                    'goal': {
-                        'name': race.goal_str,
-                        'custom': not race.goal,
-                    },
-                    'entrants_count': race.entrants_count,
-                    'entrants_count_inactive': race.entrants_count_inactive,
-                    'opened_at': race.opened_at,
-                    'started_at': race.started_at,
-                    'time_limit': race.time_limit,
-                }
-                for race in self.race_set.exclude(state__in=[
-                    RaceStates.finished,
-                    RaceStates.cancelled,
-                ]).all()
-            ],
-        }, cls=DjangoJSONEncoder)
-
-        cache.set(str(self) + '/data', value, None)
+        value = dump_category_data(self)
+
+        cache_payload(self.slug + '/data', value, None)
         return value
 
     def get_absolute_url(self):
         return reverse('category', args=(self.slug,))
 
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.__dict__.pop('permissions', None)
+
     def get_data_url(self):
         return reverse('category_data', args=(self.slug,))
 
@@ -174,24 +212,51 @@ class Category(models.Model):
         """
         Generate an unused, unique race slug for races in this category.
         """
+        return self.generate_race_slugs(1)[0]
+
+    def generate_race_slugs(self, count):
+        """
+        Generate the given number of distinct, unused race slugs for races in
+        this category.
+
+        Candidates are generated in batches, and each batch is checked
+        against existing races in a single query, so this takes the same
+        time however many races the category has had.
+        """
         if self.slug_words:
             generator = partial(generate_race_slug, self.slug_words.split('\n'))
         else:
             generator = generate_race_slug
 
-        slug = generator()
-        attempts_left = 99
-        while self.race_set.filter(slug=slug).exists() and attempts_left > 0:
-            slug = generator()
-            attempts_left -= 1
+        slugs = []
+        for _ in range(self.SLUG_BATCHES):
+            candidates = list(dict.fromkeys(
+                generator()
+                for _ in range(max(self.SLUG_BATCH_SIZE, 2 * count))
+            ))
+            used = set(self.race_set.filter(
+                slug__in=candidates,
+            ).values_list('slug', flat=True))
+            for slug in candidates:
+                if slug not in used and slug not in slugs:
+                    slugs.append(slug)
+                    if len(slugs) == count:
+                        return slugs
 
-        if attempts_left == 0:
-            raise SafeException(
-                'Cannot generate a distinct race slug. There may not be '
-                'enough slug words available.'
-            )
+        raise SafeException(
+            'Cannot generate a distinct race slug. There may not be '
+            'enough slug words available.'
+        )
 
-        return slug
+    def slug_usage(self):
+        """
+        Return the proportion of possible race slugs already used by races in
+        this category, between 0 and 1.
+        """
+        space = race_slug_space(
+            self.slug_words.split('\n') if self.slug_words else None
+        )
+        return min(self.total_race_count / space, 1)
 
     def __str__(self):
         return self.name
@@ -291,5 +356,20 @@ class Goal(models.Model):
             ),
         ]
 
+    @property
+    def stats(self):
+        """
+        Return finish time statistics for this goal as a dict.
+        """
+        return cache.get_or_set(
+            self.stats_key,
+            partial(dump_goal_stats, self),
+            settings.RT_CACHE_TIMEOUT,
+        )
+
+    @property
+    def stats_key(self):
+        return 'goal/%d/stats' % self.id
+
     def __str__(self):
         return self.name
@@ -35,7 +35,37 @@ class Message(models.Model):
         null=True,
         default=None,
     )
+    hashid = models.CharField(
+        max_length=32,
+        unique=True,
+        null=True,
+        editable=False,
+    )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if not self.hashid:
+            # The hashid is derived from the ID, so can only be set once the
+            # object has been saved.
+            self.hashid = get_hashids(self.__class__).encode(self.id)
+            self.__class__.objects.filter(id=self.id).update(hashid=self.hashid)
 
-    @property
-    def hashid(self):
-        return get_hashids(self.__class__).encode(self.id)
+    def api_dict_summary(self, race=None, can_see_deleted=False):
+        """
+        Return model data as a dict for an API response.
+        """
+        return {
+            'id': self.hashid,
+            'user': (
+                self.user.api_dict_summary(race=race)
+                if not self.user.is_system else None
+            ),
+            'posted_at': self.posted_at,
+            'message': self.message,
+            'highlight': self.highlight,
+            'is_system': self.user.is_system,
+            **({
+                'deleted': self.deleted,
+                'deleted_by': str(self.deleted_by),
+            } if can_see_deleted else {}),
+        }
@@ -0,0 +1,155 @@
+from collections import defaultdict
+from statistics import median
+
+from django.db import models
+from django.db.transaction import atomic
+
+from .choices import EntrantStates
+from ..utils import timer_html, timer_str
+
+
+class LeaderboardManager(models.Manager):
+    @atomic
+    def update_for(self, goal, users=None):
+        """
+        Recalculate leaderboard standings for the given goal from its
+        recorded races.
+
+        If users is given, only the standings for those users are updated.
+        Otherwise the whole leaderboard for the goal is rebuilt.
+
+        The goal's row is locked first, so that races recorded at the same
+        time update its standings one after the other.
+        """
+        Entrant = self.model._meta.apps.get_model('racetime', 'Entrant')
+        Goal = self.model._meta.apps.get_model('racetime', 'Goal')
+        Goal.objects.select_for_update().values('id').get(id=goal.id)
+
+        entrants = Entrant.objects.filter(
+            race__goal=goal,
+            race__recorded=True,
+            state=EntrantStates.joined.value,
+        )
+        standings = self.filter(goal=goal)
+        if users is not None:
+            entrants = entrants.filter(user__in=users)
+            standings = standings.filter(user__in=users)
+
+        results = defaultdict(list)
+        for user_id, place, finish_time, dnf, dq in entrants.values_list(
+            'user_id', 'place', 'finish_time', 'dnf', 'dq',
+        ):
+            results[user_id].append((
+                None if dnf or dq else place,
+                None if dnf or dq else finish_time,
+            ))
+
+        standings.delete()
+        self.bulk_create([
+            self.model(
+                category_id=goal.category_id,
+                goal=goal,
+                user_id=user_id,
+                **self.model.summarise(user_results),
+            )
+            for user_id, user_results in results.items()
+        ])
+
+
+class LeaderboardEntry(models.Model):
+    """
+    A user's standing on the leaderboard for a category goal.
+
+    Standings are materialized from recorded races, and updated whenever a
+    race is recorded. Use the rebuildleaderboards command to backfill them.
+    """
+    category = models.ForeignKey(
+        'Category',
+        on_delete=models.CASCADE,
+    )
+    goal = models.ForeignKey(
+        'Goal',
+        on_delete=models.CASCADE,
+    )
+    user = models.ForeignKey(
+        'User',
+        on_delete=models.CASCADE,
+    )
+    best_time = models.DurationField(
+        null=True,
+    )
+    median_time = models.DurationField(
+        null=True,
+    )
+    times_raced = models.PositiveIntegerField(
+        default=0,
+    )
+    times_finished = models.PositiveIntegerField(
+        default=0,
+    )
+    first_places = models.PositiveIntegerField(
+        default=0,
+    )
+    second_places = models.PositiveIntegerField(
+        default=0,
+    )
+    third_places = models.PositiveIntegerField(
+        default=0,
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+    )
+
+    objects = LeaderboardManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('goal', 'user'),
+                name='unique_goal_user',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['goal', 'best_time'],
+                name='leaderboard_goal_idx',
+            ),
+            models.Index(
+                fields=['user', 'category'],
+                name='leaderboard_user_idx',
+            ),
+        ]
+
+    @property
+    def best_time_html(self):
+        return timer_html(self.best_time, False) if self.best_time else None
+
+    @property
+    def best_time_str(self):
+        return timer_str(self.best_time, False) if self.best_time else None
+
+    @property
+    def median_time_html(self):
+        return timer_html(self.median_time, False) if self.median_time else None
+
+    @property
+    def median_time_str(self):
+        return timer_str(self.median_time, False) if self.median_time else None
+
+    @staticmethod
+    def summarise(results):
+        """
+        Return leaderboard fields for a list of (place, finish_time) results,
+        where both are None for a race the user did not finish.
+        """
+        places = [place for place, _ in results if place]
+        times = [finish_time for _, finish_time in results if finish_time]
+        return {
+            'best_time': min(times) if times else None,
+            'median_time': median(times) if times else None,
+            'times_raced': len(results),
+            'times_finished': len(times),
+            'first_places': places.count(1),
+            'second_places': places.count(2),
+            'third_places': places.count(3),
+        }
@@ -1,5 +1,6 @@
 import json
 from datetime import timedelta
+from hashlib import md5
 
 from django.apps import apps
 from django.conf import settings
@@ -8,17 +9,164 @@ from django.core.cache import cache
 from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models import Q
-from django.db.transaction import atomic
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.transaction import atomic, on_commit
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.functional import cached_property
 
 from .choices import EntrantStates, RaceStates
-from ..utils import SafeException, timer_html, timer_str
+from .versioned import VersionedModel
+from ..serializers import dump_race_data
+from ..utils import (
+    SafeException,
+    SyncError,
+    cache_payload,
+    payload_keys,
+    timer_html,
+    timer_str,
+)
+
+
+class RaceQuerySet(models.QuerySet):
+    def with_summary(self):
+        """
+        Return races ready to be shown in a race list.
+
+        Entrant counts are annotated with conditional aggregates, and the
+        category and goal are loaded alongside each race, so listing races
+        costs one query however many there are.
+        """
+        joined = Q(entrant__state=EntrantStates.joined.value)
+        return self.select_related('category', 'goal').annotate(
+            annotated_entrants_count=models.Count(
+                'entrant',
+                filter=joined,
+            ),
+            annotated_entrants_count_inactive=models.Count(
+                'entrant',
+                filter=joined & (Q(entrant__dnf=True) | Q(entrant__dq=True)),
+            ),
+        )
 
+    @atomic
+    def bulk_open(self, category, opened_by, rooms, monitors=(), **fields):
+        """
+        Open many race rooms in a category at once, e.g. for a tournament
+        round.
+
+        Each room in rooms is a list of users to invite to it, and every room
+        gets the given monitors and race fields. Slugs are allocated
+        together, and races, invites and monitors are each created with a
+        single INSERT. Invitees are checked as in Race.bulk_invite. Returns
+        the list of races opened and a dict of the users skipped from each
+        race, with the reason for each.
+        """
+        slugs = category.generate_race_slugs(len(rooms))
+        self.bulk_create([
+            self.model(
+                category=category,
+                slug=slug,
+                opened_by=opened_by,
+                **fields
+            )
+            for slug in slugs
+        ])
+        # bulk_create may not set primary keys, nor does it send the
+        # post_save signal that counts new races.
+        races = {race.slug: race for race in category.race_set.filter(slug__in=slugs)}
+        races = [races[slug] for slug in slugs]
+        category.adjust_race_counts(current=len(races), total=len(races))
+
+        permissions = category.permissions
+        racing = set(Entrant.objects.active().filter(
+            user__in={user for users in rooms for user in users},
+        ).values_list('user_id', flat=True))
+        monitors = [
+            user for user in monitors
+            if user != opened_by and not permissions.can_moderate(user)
+        ]
 
-class Race(models.Model):
+        invited = {}
+        skipped = {}
+        for race, users in zip(races, rooms):
+            invited[race] = []
+            skipped[race] = {}
+            for user in users:
+                if user == opened_by:
+                    skipped[race][user] = 'You cannot invite yourself.'
+                elif (
+                    not permissions.is_active(user)
+                    or permissions.is_banned_from_category(user)
+                    or (race.streaming_required and not user.twitch_channel)
+                    or user.id in racing
+                ):
+                    skipped[race][user] = 'Not allowed to join this race.'
+                else:
+                    invited[race].append(user)
+
+        Entrant.objects.bulk_create([
+            Entrant(
+                race=race,
+                user=user,
+                state=EntrantStates.invited.value,
+            )
+            for race in races
+            for user in invited[race]
+        ])
+        self.model.monitors.through.objects.bulk_create([
+            self.model.monitors.through(race=race, user=user)
+            for race in races
+            for user in monitors
+        ])
+
+        keys = set()
+        for race in races:
+            keys.update(race.cache_keys)
+            message = []
+            if invited[race]:
+                message.append(
+                    '%(invited_by)s invites %(users)s to join the race.'
+                    % {
+                        'invited_by': opened_by,
+                        'users': ', '.join(str(user) for user in invited[race]),
+                    }
+                )
+            if monitors:
+                message.append(
+                    '%(added_by)s promoted %(users)s to race monitor.'
+                    % {
+                        'added_by': opened_by,
+                        'users': ', '.join(str(user) for user in monitors),
+                    }
+                )
+            if message:
+                race.add_message(' '.join(message))
+        cache.delete_many(keys)
+        on_commit(lambda: cache.set(self.model.ADOPTION_KEY, True, None))
+
+        return races, skipped
+
+
+class EntrantQuerySet(models.QuerySet):
+    def active(self):
+        """
+        Return entrants still racing in a race that has not finished or been
+        cancelled.
+        """
+        return self.filter(
+            state=EntrantStates.joined.value,
+            dnf=False,
+            dq=False,
+            finish_time__isnull=True,
+        ).exclude(race__state__in=[
+            RaceStates.finished.value,
+            RaceStates.cancelled.value,
+        ])
+
+
+class Race(VersionedModel):
     category = models.ForeignKey(
         'Category',
         on_delete=models.CASCADE,
@@ -138,11 +286,23 @@ class Race(models.Model):
         null=True,
         db_index=True,
     )
+    archived_at = models.DateTimeField(
+        null=True,
+        editable=False,
+    )
 
+    objects = RaceQuerySet.as_manager()
+
+    # How long race chat stays open after the race has ended.
+    CHAT_WINDOW = timedelta(hours=1)
     # How long a race room can be open for with under 2 entrants.
     OPEN_TIME_LIMIT_LOWENTRANTS = timedelta(minutes=30)
     # How long a race room can be open for in general.
     OPEN_TIME_LIMIT = timedelta(hours=4)
+    # The rendered HTML blocks of a race page (see get_renders).
+    RENDER_SEGMENTS = ('actions', 'entrants', 'intro', 'monitor', 'status')
+    # Cache key set to ask racebots to adopt new races without waiting.
+    ADOPTION_KEY = 'racebot/adopt'
 
     class Meta:
         constraints = [
@@ -151,21 +311,31 @@ class Race(models.Model):
                 name='unique_category_slug',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['category', 'state', '-ended_at', '-id'],
+                name='race_category_past_idx',
+            ),
+        ]
 
     @property
     def entrants_count(self):
-        return len(self.entrant_set.filter(
-            state=EntrantStates.joined.value,
-        ))
+        if hasattr(self, 'annotated_entrants_count'):
+            return self.annotated_entrants_count
+        return len([
+            entrant for entrant in self.ordered_entrants
+            if entrant.state == EntrantStates.joined.value
+        ])
 
     @property
     def entrants_count_inactive(self):
-        return len(self.entrant_set.filter(
-            state=EntrantStates.joined.value,
-        ).exclude(
-            dnf=False,
-            dq=False,
-        ))
+        if hasattr(self, 'annotated_entrants_count_inactive'):
+            return self.annotated_entrants_count_inactive
+        return len([
+            entrant for entrant in self.ordered_entrants
+            if entrant.state == EntrantStates.joined.value
+            and (entrant.dnf or entrant.dq)
+        ])
 
     @property
     def goal_str(self):
@@ -174,6 +344,10 @@ class Race(models.Model):
         """
         return str(self.goal) if self.goal else self.custom_goal
 
+    @property
+    def is_current(self):
+        return self.state in [state.value for state in RaceStates.current]
+
     @property
     def is_preparing(self):
         return self.state in [RaceStates.open.value, RaceStates.invitational.value]
@@ -190,6 +364,21 @@ class Race(models.Model):
     def is_done(self):
         return self.state in [RaceStates.finished.value, RaceStates.cancelled.value]
 
+    @property
+    def is_frozen(self):
+        """
+        Determine if this race can no longer change, i.e. it is done, its
+        result is settled and its chat window has closed.
+        """
+        return (
+            self.is_done
+            and (self.recorded or not self.recordable)
+            and (
+                not self.ended_at
+                or self.ended_at <= timezone.now() - self.CHAT_WINDOW
+            )
+        )
+
     @property
     def json_data(self):
         """
@@ -212,6 +401,17 @@ class Race(models.Model):
             settings.RT_CACHE_TIMEOUT,
         )
 
+    @property
+    def json_state(self):
+        """
+        Return a compact snapshot of the race state as a dict.
+        """
+        return cache.get_or_set(
+            str(self) + '/state',
+            self.dump_json_state,
+            settings.RT_CACHE_TIMEOUT,
+        )
+
     @property
     def monitor_list(self):
         """
@@ -219,7 +419,7 @@ class Race(models.Model):
         """
         return ', '.join(str(user) for user in self.monitors.all())
 
-    @property
+    @cached_property
     def ordered_entrants(self):
         """
         All race entrants in appropriate order.
@@ -233,60 +433,26 @@ class Race(models.Model):
             6. Did not finish
             7. Disqualified
             8. Declined invite
+
+        Entrants are loaded once per race object, along with their users.
+        User bans are taken from the race's permission snapshot.
         """
-        return self.entrant_set.annotate(
-            state_sort=models.Case(
-                # Finished
-                models.When(
-                    place__isnull=False,
-                    dnf=False,
-                    dq=False,
-                    then=1,
-                ),
-                # In progress or pending
-                models.When(
-                    state=EntrantStates.joined.value,
-                    place__isnull=True,
-                    ready=True,
-                    dnf=False,
-                    dq=False,
-                    then=2,
-                ),
-                # Not ready
-                models.When(
-                    state=EntrantStates.joined.value,
-                    ready=False,
-                    then=3,
-                ),
-                # Invited
-                models.When(
-                    state=EntrantStates.invited.value,
-                    then=4,
-                ),
-                # Requested to join
-                models.When(
-                    state=EntrantStates.requested.value,
-                    then=5,
-                ),
-                # Did not finish
-                models.When(
-                    dnf=True,
-                    then=6,
-                ),
-                # Disqualified
-                models.When(
-                    dq=True,
-                    then=7,
-                ),
-                # Declined invite
-                models.When(
-                    state=EntrantStates.declined.value,
-                    then=8,
-                ),
-                output_field=models.PositiveSmallIntegerField(),
-                default=0,
-            ),
-        ).order_by('state_sort', 'place', 'finish_time').all()
+        entrants = self.entrant_set.select_related('user').order_by('id')
+        for entrant in entrants:
+            entrant.user.is_banned = self.permissions.is_banned(entrant.user)
+
+        return sorted(entrants, key=lambda entrant: (
+            entrant.state_sort,
+            entrant.place or 0,
+            entrant.finish_time or timedelta(0),
+        ))
+
+    @cached_property
+    def permissions(self):
+        """
+        Return a PermissionSnapshot for this race.
+        """
+        return self.category.permissions.for_race(self)
 
     @property
     def state_info(self):
@@ -294,7 +460,7 @@ class Race(models.Model):
 
     @property
     def tick_rate(self):
-        if self.ended_at and timezone.now() - self.ended_at > timedelta(hours=1):
+        if self.ended_at and timezone.now() - self.ended_at > self.CHAT_WINDOW:
             return 86400000
         if self.is_pending:
             return 100
@@ -322,6 +488,36 @@ class Race(models.Model):
     def timer_html(self):
         return timer_html(self.timer)
 
+    @property
+    def cache_keys(self):
+        """
+        Return the cache keys holding this race's data, renders and state,
+        along with its category's data (which lists the race).
+        """
+        keys = [
+            self.role_renders_key(role, segment)
+            for role in (None, 'monitor', 'moderator')
+            for segment in self.RENDER_SEGMENTS
+            if segment != 'actions'
+        ]
+        keys.append(str(self) + '/state')
+        for key in (
+            str(self) + '/data',
+            str(self) + '/renders',
+            self.category.slug + '/data',
+        ):
+            keys += payload_keys(key)
+        return keys
+
+    def invalidate_caches(self):
+        """
+        Delete this race's cached data, renders and state.
+
+        This happens automatically when a race or entrant is saved, but must
+        be done after changing entrants with a queryset update.
+        """
+        cache.delete_many(self.cache_keys)
+
     def add_message(self, message, highlight=False):
         """
         Add a system-generated chat message for this race.
@@ -339,107 +535,187 @@ class Race(models.Model):
         self.add_message('.reload')
 
     def dump_json_data(self):
-        value = json.dumps({
-            'name': str(self),
+        value = dump_race_data(self)
+
+        cache_payload(str(self) + '/data', value, None)
+        return value
+
+    def dump_json_state(self):
+        """
+        Build a snapshot of the parts of the race page that change while the
+        race goes on: entrant rows, race status and timer anchors.
+
+        The snapshot is identified by a revision hash of its contents, and
+        is kept in the cache under that revision so that later requests can
+        be answered with only what has changed since (see get_state_diff).
+        """
+        entrants = list(self.ordered_entrants)
+        state = {
             'status': {
                 'value': self.state_info.value,
                 'verbose_value': self.state_info.verbose_value,
                 'help_text': self.state_info.help_text,
             },
-            'url': self.get_absolute_url(),
-            'data_url': self.get_data_url(),
-            'category': self.category.api_dict_summary(),
-            'goal': {
-                'name': self.goal_str,
-                'custom': not self.goal,
+            'timer': {
+                'started_at': self.started_at,
+                'autotick': self.is_pending or self.is_in_progress,
+                'html': (
+                    None if self.is_pending or self.is_in_progress
+                    else self.timer_html
+                ),
             },
-            'info': self.info,
-            'entrants_count': self.entrants_count,
-            'entrants_count_inactive': self.entrants_count_inactive,
-            'entrants': [
-                {
-                    'user': entrant.user.api_dict_summary(race=self),
-                    'status': {
-                        'value': entrant.summary[0],
-                        'verbose_value': entrant.summary[1],
-                        'help_text': entrant.summary[2],
-                    },
-                    'finish_time': entrant.finish_time,
-                    'place': entrant.place,
-                    'place_ordinal': ordinal(entrant.place) if entrant.place else None,
-                    'comment': entrant.comment,
-                    'stream_live': entrant.stream_live,
-                    'stream_override': entrant.stream_override,
-                }
-                for entrant in self.ordered_entrants
-            ],
-            'opened_at': self.opened_at,
-            'start_delay': self.start_delay,
-            'started_at': self.started_at,
-            'ended_at': self.ended_at,
-            'time_limit': self.time_limit,
-            'opened_by': self.opened_by.api_dict_summary(race=self),
-            'monitors': [user.api_dict_summary(race=self) for user in self.monitors.all()],
-            'recordable': self.recordable,
-            'recorded': self.recorded,
-            'recorded_by': self.recorded_by.api_dict_summary(race=self) if self.recorded_by else None,
-            'allow_comments': self.allow_comments,
-            'allow_midrace_chat': self.allow_midrace_chat,
-        }, cls=DjangoJSONEncoder)
-
-        cache.set(str(self) + '/data', value, None)
-        return value
+            'counts': {
+                'entrants': self.entrants_count,
+                'inactive': self.entrants_count_inactive,
+            },
+            'entrants_order': [entrant.user.hashid for entrant in entrants],
+            'entrants': {
+                entrant.user.hashid: entrant.api_dict_state()
+                for entrant in entrants
+            },
+        }
+        state = json.loads(json.dumps(state, cls=DjangoJSONEncoder))
+        state['revision'] = md5(
+            json.dumps(state, sort_keys=True).encode()
+        ).hexdigest()
+
+        cache.set(str(self) + '/state', state, None)
+        cache.set(
+            str(self) + '/state/' + state['revision'],
+            state,
+            settings.RT_CACHE_TIMEOUT,
+        )
+        return state
+
+    def get_state_diff(self, since=None):
+        """
+        Return the parts of the race state that have changed since the given
+        revision.
+
+        Entrant rows are only included if they are new or have changed. If
+        the given revision is unknown (or expired), the full state is
+        returned instead.
+        """
+        state = self.json_state
+        previous = None
+        if since and since.isalnum():
+            previous = cache.get(str(self) + '/state/' + since)
+        if not previous:
+            return state
+
+        diff = {
+            'revision': state['revision'],
+            'entrants': {
+                hashid: row
+                for hashid, row in state['entrants'].items()
+                if previous['entrants'].get(hashid) != row
+            },
+        }
+        for key in ('status', 'timer', 'counts', 'entrants_order'):
+            if state[key] != previous[key]:
+                diff[key] = state[key]
+        return diff
 
     def dump_json_renders(self):
         value = json.dumps(self.get_renders(), cls=DjangoJSONEncoder)
 
-        cache.set(str(self) + '/renders', value, None)
+        cache_payload(str(self) + '/renders', value, None)
         return value
 
-    def get_renders(self, user=None, request=None):
-        if not user or not user.is_active:
-            return {
-                'actions': '',
-                'entrants': render_to_string('racetime/race/entrants.html', {'race': self}, request),
-                'intro': render_to_string('racetime/race/intro.html', {'race': self}, request),
-                'monitor': '',
-                'status': render_to_string('racetime/race/status.html', {'race': self}, request),
-            }
+    def get_renders(self, user=None, request=None, segments=None):
+        """
+        Return rendered race HTML blocks for the given user.
 
-        available_actions = self.available_actions(user)
-        can_moderate = self.category.can_moderate(user)
-        can_monitor = self.can_monitor(user)
+        If segments are given, only those blocks are returned (or rendered).
+        """
+        if not user or not self.permissions.is_active(user):
+            return self.get_role_renders(None, segments)
 
-        renders = {
-            'actions': '',
-            'entrants': render_to_string('racetime/race/entrants.html', {
-                'can_moderate': can_moderate,
-                'can_monitor': can_monitor,
-                'race': self,
-            }, request),
-            'intro': render_to_string('racetime/race/intro.html', {'race': self}, request),
-            'monitor': '',
-            'status': render_to_string('racetime/race/status.html', {'race': self}, request),
-        }
+        if self.category.can_moderate(user):
+            role = 'moderator'
+        elif self.can_monitor(user):
+            role = 'monitor'
+        else:
+            role = None
+
+        renders = self.get_role_renders(role, segments)
 
-        if available_actions:
-            renders['actions'] = render_to_string('racetime/race/actions.html', {
-                'available_actions': self.available_actions(user),
-                'race': self,
-            }, request)
-        elif self.is_pending:
-            renders['actions'] = render_to_string('racetime/race/actions_pending.html', None, request)
-
-        if can_monitor:
-            from ..forms import InviteForm
-            renders['monitor'] = render_to_string('racetime/race/monitor.html', {
-                'can_moderate': self.category.can_moderate(user),
-                'race': self,
-                'invite_form': InviteForm(),
-            }, request)
+        if 'actions' in renders:
+            available_actions = self.available_actions(user)
+            if available_actions:
+                renders['actions'] = render_to_string('racetime/race/actions.html', {
+                    'available_actions': available_actions,
+                    'race': self,
+                }, request)
+            elif self.is_pending:
+                renders['actions'] = render_to_string('racetime/race/actions_pending.html', None, request)
 
         return renders
 
+    def get_role_renders(self, role=None, segments=None):
+        """
+        Return rendered race HTML blocks for the given viewer role.
+
+        These blocks do not depend on the individual viewer (they carry no
+        CSRF token), so each one is cached and shared by every user with the
+        same role. The role may be None (public), "monitor" or "moderator".
+        If segments are given, only those blocks are returned (or rendered).
+        The actions block is always empty here, see get_renders.
+        """
+        segments = [
+            segment for segment in self.RENDER_SEGMENTS
+            if segments is None or segment in segments
+        ]
+        keys = {
+            self.role_renders_key(role, segment): segment
+            for segment in segments
+            if segment != 'actions'
+        }
+        renders = {
+            keys[key]: value
+            for key, value in cache.get_many(keys).items()
+        }
+        missing = [segment for segment in keys.values() if segment not in renders]
+        if missing:
+            renders.update(self.dump_role_renders(role, missing))
+
+        return {segment: renders.get(segment, '') for segment in segments}
+
+    def dump_role_renders(self, role=None, segments=None):
+        from ..forms import InviteForm
+
+        can_moderate = role == 'moderator'
+        value = {}
+        for segment in segments or self.RENDER_SEGMENTS:
+            if segment == 'entrants':
+                value[segment] = render_to_string('racetime/race/entrants.html', {
+                    'can_moderate': can_moderate,
+                    'can_monitor': bool(role),
+                    'race': self,
+                })
+            elif segment == 'intro':
+                value[segment] = render_to_string('racetime/race/intro.html', {'race': self})
+            elif segment == 'monitor':
+                value[segment] = render_to_string('racetime/race/monitor.html', {
+                    'can_moderate': can_moderate,
+                    'race': self,
+                    'invite_form': InviteForm(),
+                }) if role else ''
+            elif segment == 'status':
+                value[segment] = render_to_string('racetime/race/status.html', {'race': self})
+
+        cache.set_many({
+            self.role_renders_key(role, segment): render
+            for segment, render in value.items()
+        }, None)
+        return value
+
+    def role_renders_key(self, role, segment):
+        """
+        Return the cache key for one rendered block for the given viewer role.
+        """
+        return str(self) + '/renders/' + (role or 'public') + '/' + segment
+
     def available_actions(self, user):
         if not user.is_authenticated:
             return []
@@ -482,8 +758,8 @@ class Race(models.Model):
         Determine if the user is allowed to join this race.
         """
         return (
-            user.is_active
-            and not user.is_banned_from_category(self.category)
+            self.permissions.is_active(user)
+            and not self.permissions.is_banned_from_category(user)
             and not self.in_race(user)
             and (not self.streaming_required or user.twitch_channel)
             and not user.active_race_entrant
@@ -493,11 +769,7 @@ class Race(models.Model):
         """
         Determine if the given user has the ability to monitor this race.
         """
-        return user.is_active and (
-            self.category.can_moderate(user)
-            or self.opened_by == user
-            or user in self.monitors.all()
-        )
+        return self.permissions.can_monitor(user)
 
     def can_add_monitor(self, user):
         return not self.is_done and not self.can_monitor(user)
@@ -505,17 +777,19 @@ class Race(models.Model):
     def add_monitor(self, user, added_by):
         if self.can_add_monitor(user):
             self.monitors.add(user)
+            self.__dict__.pop('permissions', None)
             self.add_message(
                 '%(added_by)s promoted %(user)s to race monitor.'
                 % {'added_by': added_by, 'user': user}
             )
 
     def can_remove_monitor(self, user):
-        return not self.is_done and user in self.monitors.all()
+        return not self.is_done and self.permissions.is_monitor(user)
 
     def remove_monitor(self, user, removed_by):
         if self.can_remove_monitor(user):
             self.monitors.remove(user)
+            self.__dict__.pop('permissions', None)
             self.add_message(
                 '%(removed_by)s demoted %(user)s from race monitor.'
                 % {'removed_by': removed_by, 'user': user}
@@ -527,9 +801,12 @@ class Race(models.Model):
         if the user has not yet entered.
         """
         try:
-            return self.entrant_set.get(user=user)
+            entrant = self.entrant_set.get(user=user)
         except self.entrant_set.model.DoesNotExist:
             return None
+        # Reuse the given user object rather than loading it again.
+        entrant.user = user
+        return entrant
 
     @property
     def can_begin(self):
@@ -578,6 +855,7 @@ class Race(models.Model):
             self.ended_at = timezone.now()
             self.__dnf_remaining_entrants()
         self.save()
+        self.category.adjust_race_counts(current=-1)
 
         if cancelled_by:
             self.add_message(
@@ -596,17 +874,27 @@ class Race(models.Model):
         self.state = RaceStates.finished.value
         self.ended_at = timezone.now()
         self.save()
+        self.category.adjust_race_counts(current=-1)
         self.__dnf_remaining_entrants()
         self.add_message(
             'Race finished in %(timer)s' % {'timer': self.timer_str},
             highlight=True,
         )
 
+    @atomic
     def record(self, recorded_by):
         if self.recordable and not self.recorded:
             self.recorded = True
             self.recorded_by = recorded_by
             self.save()
+            apps.get_model('racetime', 'LeaderboardEntry').objects.update_for(
+                self.goal,
+                users=self.entrant_set.filter(
+                    state=EntrantStates.joined.value,
+                ).values('user_id'),
+            )
+            apps.get_model('racetime', 'Rating').objects.update_for_race(self)
+            cache.delete(self.goal.stats_key)
             self.add_message(
                 'Race result recorded by %(recorded_by)s'
                 % {'recorded_by': recorded_by},
@@ -669,17 +957,155 @@ class Race(models.Model):
             raise SafeException('User is not eligible to join this race.')
 
     @atomic
-    def recalculate_places(self):
-        place = 1
+    def bulk_invite(self, users, invited_by):
+        """
+        Invite many users to the race at once.
+
+        Eligibility is checked as in can_join, but for all users together
+        with two queries, and invites are created with a single INSERT.
+        Returns the list of users invited and a dict of the users skipped
+        with the reason for each.
+        """
+        if not self.is_preparing:
+            raise SafeException('Invites can only be sent before the race starts.')
+
+        user_ids = [user.id for user in users]
+        entered = set(self.entrant_set.filter(
+            user_id__in=user_ids,
+        ).values_list('user_id', flat=True))
+        racing = set(Entrant.objects.active().filter(
+            user_id__in=user_ids,
+        ).values_list('user_id', flat=True))
+
+        invited = []
+        skipped = {}
+        for user in users:
+            if user == invited_by:
+                skipped[user] = 'You cannot invite yourself.'
+            elif user.id in entered:
+                skipped[user] = 'Already an entrant.'
+            elif (
+                not self.permissions.is_active(user)
+                or self.permissions.is_banned_from_category(user)
+                or (self.streaming_required and not user.twitch_channel)
+                or user.id in racing
+            ):
+                skipped[user] = 'Not allowed to join this race.'
+            else:
+                invited.append(user)
+
+        if invited:
+            Entrant.objects.bulk_create([
+                Entrant(
+                    race=self,
+                    user=user,
+                    state=EntrantStates.invited.value,
+                )
+                for user in invited
+            ])
+            self.invalidate_caches()
+            self.add_message(
+                '%(invited_by)s invites %(users)s to join the race.'
+                % {
+                    'invited_by': invited_by,
+                    'users': ', '.join(str(user) for user in invited),
+                }
+            )
+        return invited, skipped
+
+    @atomic
+    def bulk_entrant_action(self, action, hashids, acted_by):
+        """
+        Apply a monitor action to the entrants with the given user hashids.
+
+        The supported actions are "accept_request", "force_unready" and
+        "remove". Entrants the action cannot apply to are skipped, and a
+        SafeException is raised if that leaves none. The rest are locked,
+        changed with a single statement, and listed in one system message.
+        Returns the number of entrants acted on.
+        """
+        entrants = self.entrant_set.filter(user__hashid__in=hashids)
+        if action == 'accept_request':
+            entrants = entrants.filter(state=EntrantStates.requested.value)
+            message = '%(acted_by)s accepts requests to join from %(users)s.'
+        elif action == 'force_unready':
+            entrants = entrants.filter(
+                state=EntrantStates.joined.value,
+                ready=True,
+            ) if self.is_preparing else entrants.none()
+            message = '%(acted_by)s unreadies %(users)s.'
+        elif action == 'remove':
+            entrants = entrants.exclude(
+                state=EntrantStates.declined.value,
+            ) if self.is_preparing else entrants.none()
+            message = '%(acted_by)s removes %(users)s from the race.'
+        else:
+            raise SafeException('Unknown action: %(action)s.' % {'action': action})
+
+        entrants = list(
+            entrants.select_for_update().select_related('user').order_by('id')
+        )
+        if not entrants:
+            raise SafeException(
+                'That action does not apply to any of the selected entrants.'
+            )
 
-        for entrant in self.entrant_set.filter(
+        queryset = Entrant.objects.filter(id__in=[entrant.id for entrant in entrants])
+        if action == 'accept_request':
+            queryset.update(
+                state=EntrantStates.joined.value,
+                version=F('version') + 1,
+            )
+        elif action == 'force_unready':
+            queryset.update(ready=False, version=F('version') + 1)
+        else:
+            queryset.delete()
+        self.invalidate_caches()
+
+        self.add_message(message % {
+            'acted_by': acted_by,
+            'users': ', '.join(str(entrant.user) for entrant in entrants),
+        })
+        return len(entrants)
+
+    def lock(self):
+        """
+        Lock this race's row until the end of the current transaction.
+
+        Changes to entrant places take this lock first, so that entrants
+        finishing at the same moment cannot be given the same place.
+        """
+        Race.objects.select_for_update().values('id').get(id=self.id)
+
+    @atomic
+    def recalculate_places(self):
+        """
+        Set the place of every finished entrant from their finish time, in a
+        single UPDATE. Equal times are placed in the order entrants joined.
+        """
+        finished = self.entrant_set.filter(
             finish_time__isnull=False,
             dnf=False,
             dq=False,
-        ).order_by('finish_time'):
-            entrant.place = place
-            entrant.save()
-            place += 1
+        )
+        finished.update(
+            place=Subquery(
+                finished.filter(
+                    Q(finish_time__lt=OuterRef('finish_time'))
+                    | Q(finish_time=OuterRef('finish_time'), id__lte=OuterRef('id'))
+                ).order_by().values('race').annotate(
+                    place=models.Count('id'),
+                ).values('place')
+            ),
+            version=F('version') + 1,
+        )
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.__dict__.pop('ordered_entrants', None)
+        self.__dict__.pop('permissions', None)
+        if Race.category.is_cached(self):
+            self.category.__dict__.pop('permissions', None)
 
     def get_absolute_url(self):
         return reverse('race', args=(self.category.slug, self.slug))
@@ -708,14 +1134,10 @@ class Race(models.Model):
 
         This should always be done atomically.
         """
-        entrants = []
-        for entrant in self.__remaining_entrants:
-            entrant.dnf = True
-            entrants.append(entrant)
-        Entrant.objects.bulk_update(entrants, ['dnf'])
+        self.__remaining_entrants.update(dnf=True, version=F('version') + 1)
 
 
-class Entrant(models.Model):
+class Entrant(VersionedModel):
     user = models.ForeignKey(
         'User',
         on_delete=models.CASCADE,
@@ -760,6 +1182,8 @@ class Entrant(models.Model):
         default=False,
     )
 
+    objects = EntrantQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -784,6 +1208,50 @@ class Entrant(models.Model):
     def finish_time_str(self):
         return timer_str(self.finish_time, False) if self.finish_time else None
 
+    @property
+    def state_sort(self):
+        """
+        Return this entrant's sort group, as documented on
+        Race.ordered_entrants.
+        """
+        joined = self.state == EntrantStates.joined.value
+        if self.place is not None and not self.dnf and not self.dq:
+            return 1
+        if joined and self.place is None and self.ready and not self.dnf and not self.dq:
+            return 2
+        if joined and not self.ready:
+            return 3
+        if self.state == EntrantStates.invited.value:
+            return 4
+        if self.state == EntrantStates.requested.value:
+            return 5
+        if self.dnf:
+            return 6
+        if self.dq:
+            return 7
+        if self.state == EntrantStates.declined.value:
+            return 8
+        return 0
+
+    @property
+    def monitor_actions(self):
+        """
+        Return a list of monitor actions that can currently be taken on this
+        entrant. Some of these actions are only available to moderators.
+        """
+        return [
+            action for action, available in (
+                ('accept_request', self.can_accept_request),
+                ('force_unready', self.can_force_unready),
+                ('override_stream', self.can_override_stream),
+                ('remove', self.can_remove),
+                ('disqualify', self.can_disqualify),
+                ('undisqualify', self.can_undisqualify),
+                ('add_monitor', self.can_add_monitor),
+                ('remove_monitor', self.can_remove_monitor),
+            ) if available
+        ]
+
     @property
     def summary(self):
         """
@@ -810,6 +1278,31 @@ class Entrant(models.Model):
             return 'ready', 'Ready', 'Ready to begin the race.'
         return 'not_ready', 'Not ready', 'Not ready to begin yet.'
 
+    def api_dict_state(self):
+        """
+        Return entrant data as a dict for the race state endpoint, with
+        everything needed to render the entrant's row on the race page.
+        """
+        return {
+            'user': {
+                'name': self.user.name,
+                'discriminator': self.user.discriminator if self.user.use_discriminator else None,
+                'flair': self.user.flair(),
+                'avatar': self.user.avatar.url if self.user.avatar else None,
+                'twitch_channel': self.user.twitch_channel,
+            },
+            'status': {
+                'value': self.summary[0],
+                'verbose_value': self.summary[1],
+                'help_text': self.summary[2],
+            },
+            'place_ordinal': ordinal(self.place) if self.place else None,
+            'finish_time': self.finish_time_str,
+            'comment': self.comment,
+            'stream_live': self.stream_live,
+            'monitor_actions': self.monitor_actions,
+        }
+
     def cancel_request(self):
         if self.state == EntrantStates.requested.value:
             self.delete()
@@ -818,7 +1311,7 @@ class Entrant(models.Model):
                 % {'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     def accept_invite(self):
         if self.state == EntrantStates.invited.value:
@@ -829,7 +1322,7 @@ class Entrant(models.Model):
                 % {'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     def decline_invite(self):
         if self.state == EntrantStates.invited.value:
@@ -840,7 +1333,7 @@ class Entrant(models.Model):
                 % {'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     def leave(self):
         if self.state == EntrantStates.joined.value and self.race.is_preparing:
@@ -850,7 +1343,7 @@ class Entrant(models.Model):
                 % {'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     def is_ready(self):
         if (
@@ -863,7 +1356,7 @@ class Entrant(models.Model):
             self.save()
             self.race.add_message('%(user)s is ready!' % {'user': self.user})
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     def not_ready(self):
         if self.state == EntrantStates.joined.value and self.race.is_preparing and self.ready:
@@ -874,31 +1367,35 @@ class Entrant(models.Model):
                 % {'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
+    @atomic
     def done(self):
+        # Take the time before waiting for the race lock, so that entrants
+        # finishing together are not held up by each other.
+        finished_at = timezone.now()
+        self.race.lock()
         if self.state == EntrantStates.joined.value \
                 and self.race.is_in_progress \
                 and self.ready \
                 and not self.dnf \
                 and not self.dq \
                 and not self.finish_time:
-            self.finish_time = timezone.now() - self.race.started_at
-            self.place = len(self.race.entrant_set.filter(
-                dnf=False,
-                dq=False,
-                finish_time__isnull=False,
-            )) + 1
+            self.finish_time = finished_at - self.race.started_at
             self.save()
+            self.race.recalculate_places()
+            self.refresh_from_db(fields=['place', 'version'])
             self.race.add_message(
                 '%(user)s has ##good##finished## in %(place)s place with a time of %(time)s!'
                 % {'user': self.user, 'place': ordinal(self.place), 'time': self.finish_time_str}
             )
             self.race.finish_if_none_remaining()
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
+    @atomic
     def undone(self):
+        self.race.lock()
         if self.state == EntrantStates.joined.value \
                 and self.race.is_in_progress \
                 and self.ready \
@@ -914,7 +1411,7 @@ class Entrant(models.Model):
             )
             self.race.recalculate_places()
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     def forfeit(self):
         if self.state == EntrantStates.joined.value \
@@ -931,7 +1428,7 @@ class Entrant(models.Model):
             )
             self.race.finish_if_none_remaining()
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     def unforfeit(self):
         if self.state == EntrantStates.joined.value \
@@ -947,7 +1444,7 @@ class Entrant(models.Model):
                 % {'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     @property
     def can_add_comment(self):
@@ -973,7 +1470,7 @@ class Entrant(models.Model):
                 % {'user': self.user, 'comment': comment}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     @property
     def can_accept_request(self):
@@ -988,7 +1485,7 @@ class Entrant(models.Model):
                 % {'accepted_by': accepted_by, 'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     @property
     def can_force_unready(self):
@@ -1007,7 +1504,7 @@ class Entrant(models.Model):
                 % {'forced_by': forced_by, 'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     @property
     def can_remove(self):
@@ -1021,7 +1518,7 @@ class Entrant(models.Model):
                 % {'removed_by': removed_by, 'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     @property
     def can_disqualify(self):
@@ -1033,7 +1530,9 @@ class Entrant(models.Model):
             and not self.dq
         )
 
+    @atomic
     def disqualify(self, disqualified_by):
+        self.race.lock()
         if self.can_disqualify:
             self.dq = True
             self.save()
@@ -1045,7 +1544,7 @@ class Entrant(models.Model):
                 self.race.recalculate_places()
             self.race.finish_if_none_remaining()
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     @property
     def can_undisqualify(self):
@@ -1056,16 +1555,21 @@ class Entrant(models.Model):
             and self.dq
         )
 
+    @atomic
     def undisqualify(self, undisqualified_by):
+        self.race.lock()
         if self.can_undisqualify:
             self.dq = False
             self.save()
+            if self.finish_time:
+                self.race.recalculate_places()
+                self.refresh_from_db(fields=['place', 'version'])
             self.race.add_message(
                 '%(user)s has been un-disqualified from the race by %(undisqualified_by)s.'
                 % {'undisqualified_by': undisqualified_by, 'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     @property
     def can_override_stream(self):
@@ -1085,7 +1589,7 @@ class Entrant(models.Model):
                 % {'overridden_by': overridden_by, 'user': self.user}
             )
         else:
-            raise SafeException('Possible sync error. Refresh to continue.')
+            raise SyncError
 
     def __str__(self):
         return str(self.user)
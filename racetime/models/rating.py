@@ -0,0 +1,207 @@
+from itertools import groupby
+
+from django.db import models
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from .choices import EntrantStates
+from .. import ratings
+
+
+class RatingManager(models.Manager):
+    @atomic
+    def update_for_race(self, race):
+        """
+        Update ratings for the entrants of a race that has just been recorded.
+        """
+        results = list(race.entrant_set.filter(
+            state=EntrantStates.joined.value,
+        ).values_list('user_id', 'place', 'dnf', 'dq'))
+        user_ids = [user_id for user_id, *_ in results]
+        ranks = ratings.rank_results([
+            (place, not dnf and not dq)
+            for _, place, dnf, dq in results
+        ])
+
+        existing = {
+            rating.user_id: rating
+            for rating in self.select_for_update().filter(
+                goal=race.goal,
+                user_id__in=user_ids,
+            )
+        }
+        current = [
+            self.model(
+                category_id=race.category_id,
+                goal_id=race.goal_id,
+                user_id=user_id,
+                rating=ratings.INITIAL_RATING,
+                races=0,
+            ) if user_id not in existing else existing[user_id]
+            for user_id in user_ids
+        ]
+        changes = ratings.rating_changes(
+            [rating.rating for rating in current],
+            ranks,
+        )
+
+        now = timezone.now()
+        history = []
+        for rating, change in zip(current, changes):
+            history.append(RatingChange(
+                goal_id=race.goal_id,
+                user_id=rating.user_id,
+                race=race,
+                rating_before=rating.rating,
+                rating_after=rating.rating + change,
+            ))
+            rating.rating += change
+            rating.races += 1
+            rating.updated_at = now
+
+        self.bulk_update(
+            [rating for rating in current if rating.pk],
+            ['rating', 'races', 'updated_at'],
+        )
+        self.bulk_create([rating for rating in current if not rating.pk])
+        RatingChange.objects.bulk_create(history)
+
+    @atomic
+    def rebuild(self, goal):
+        """
+        Recalculate all ratings for a goal by replaying its recorded races in
+        the order they finished. Returns the number of races replayed.
+        """
+        Entrant = self.model._meta.apps.get_model('racetime', 'Entrant')
+        entrants = Entrant.objects.filter(
+            race__goal=goal,
+            race__recorded=True,
+            state=EntrantStates.joined.value,
+        ).order_by('race__ended_at', 'race_id', 'id').values_list(
+            'race_id', 'user_id', 'place', 'dnf', 'dq',
+        )
+
+        positions = {}
+        races = []
+        race_ids = []
+        for race_id, results in groupby(entrants, key=lambda result: result[0]):
+            results = list(results)
+            races.append((
+                [
+                    positions.setdefault(user_id, len(positions))
+                    for _, user_id, *_ in results
+                ],
+                ratings.rank_results([
+                    (place, not dnf and not dq)
+                    for *_, place, dnf, dq in results
+                ]),
+            ))
+            race_ids.append(race_id)
+
+        final, changes = ratings.replay(races, len(positions))
+        user_ids = list(positions)
+
+        history = []
+        before = [ratings.INITIAL_RATING] * len(positions)
+        counts = [0] * len(positions)
+        for race_id, (indices, _), race_changes in zip(race_ids, races, changes):
+            for i, change in zip(indices, race_changes):
+                history.append(RatingChange(
+                    goal=goal,
+                    user_id=user_ids[i],
+                    race_id=race_id,
+                    rating_before=before[i],
+                    rating_after=before[i] + change,
+                ))
+                before[i] += change
+                counts[i] += 1
+
+        RatingChange.objects.filter(goal=goal).delete()
+        self.filter(goal=goal).delete()
+        self.bulk_create([
+            self.model(
+                category_id=goal.category_id,
+                goal=goal,
+                user_id=user_id,
+                rating=final[i],
+                races=counts[i],
+            )
+            for i, user_id in enumerate(user_ids)
+        ], batch_size=1000)
+        RatingChange.objects.bulk_create(history, batch_size=1000)
+        return len(races)
+
+
+class Rating(models.Model):
+    """
+    A user's current skill rating for a category goal. See racetime.ratings.
+    """
+    category = models.ForeignKey(
+        'Category',
+        on_delete=models.CASCADE,
+    )
+    goal = models.ForeignKey(
+        'Goal',
+        on_delete=models.CASCADE,
+    )
+    user = models.ForeignKey(
+        'User',
+        on_delete=models.CASCADE,
+    )
+    rating = models.FloatField(
+        default=ratings.INITIAL_RATING,
+    )
+    races = models.PositiveIntegerField(
+        default=0,
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+    )
+
+    objects = RatingManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('goal', 'user'),
+                name='unique_rating_goal_user',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['goal', '-rating'],
+                name='rating_goal_idx',
+            ),
+        ]
+
+    @property
+    def rating_display(self):
+        return round(self.rating)
+
+
+class RatingChange(models.Model):
+    """
+    The change in a user's rating from one recorded race.
+    """
+    goal = models.ForeignKey(
+        'Goal',
+        on_delete=models.CASCADE,
+    )
+    user = models.ForeignKey(
+        'User',
+        on_delete=models.CASCADE,
+    )
+    race = models.ForeignKey(
+        'Race',
+        on_delete=models.CASCADE,
+    )
+    rating_before = models.FloatField()
+    rating_after = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'goal', 'race'],
+                name='rating_change_user_idx',
+            ),
+        ]
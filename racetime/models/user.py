@@ -1,3 +1,4 @@
+import random
 from hashlib import md5
 from urllib.parse import urlencode
 
@@ -9,12 +10,11 @@ from django.contrib.auth.models import PermissionsMixin
 from django.core.cache import cache
 from django.core.validators import RegexValidator, MinLengthValidator
 from django.db import models
-from django.db.models import Q
+from django.db.models.expressions import RawSQL
 from django.urls import reverse
 from django.utils.functional import cached_property
 
-from .choices import EntrantStates, RaceStates
-from ..utils import get_hashids
+from ..utils import SafeException, get_hashids
 
 
 class UserManager(BaseUserManager):
@@ -33,12 +33,49 @@ class UserManager(BaseUserManager):
 
         return self._create_user(email, password, **extra_fields)
 
+    def allocate_discriminator(self, name, exclude_id=None, preferred=None):
+        """
+        Return an expression that picks a discriminator not used by any other
+        user with the given name, for saving to the discriminator field.
+
+        The value is chosen by the database in the same statement that saves
+        the user, so two users saved at once cannot be given the same value.
+        The preferred discriminator is kept if it is free. Otherwise the first
+        free value after a random offset is used.
+        """
+        taken = self.filter(name=name).exclude(id=exclude_id)
+        if taken.count() >= 9998:
+            raise SafeException(
+                'There are no discriminators left for the name "%(name)s".'
+                % {'name': name}
+            )
+
+        taken_sql = 'SELECT discriminator FROM %s WHERE name = %%s' % (
+            self.model._meta.db_table,
+        )
+        taken_params = [name]
+        if exclude_id:
+            taken_sql += ' AND id <> %s'
+            taken_params.append(exclude_id)
+
+        return RawSQL(
+            'WITH RECURSIVE candidates(i) AS ('
+            ' SELECT 1 UNION ALL SELECT i + 1 FROM candidates WHERE i < 9998'
+            ') '
+            'SELECT discriminator FROM ('
+            ' SELECT CAST(%s AS VARCHAR(4)) AS discriminator, -1 AS position'
+            ' UNION ALL'
+            ' SELECT SUBSTR(CAST(10000 + i AS VARCHAR(5)), 2),'
+            ' (i + %s) %% 9998 FROM candidates'
+            ') AS free '
+            'WHERE discriminator IS NOT NULL'
+            ' AND discriminator NOT IN (' + taken_sql + ') '
+            'ORDER BY position LIMIT 1',
+            [preferred, random.randint(0, 9997), *taken_params],
+        )
+
     def get_by_hashid(self, hashid):
-        try:
-            user_id, = get_hashids(User).decode(hashid)
-        except ValueError:
-            raise self.model.DoesNotExist from None
-        return self.get(id=user_id)
+        return self.get(hashid=hashid)
 
     def get_system_user(self):
         return self.get(email=User.SYSTEM_USER)
@@ -117,6 +154,12 @@ class User(AbstractBaseUser, PermissionsMixin):
         max_length=25,
         null=True,
     )
+    hashid = models.CharField(
+        max_length=32,
+        unique=True,
+        null=True,
+        editable=False,
+    )
 
     objects = UserManager()
 
@@ -124,6 +167,14 @@ class User(AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = ['name']
     SYSTEM_USER = 'system@racetime.gg'
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'discriminator'],
+                name='unique_name_discriminator',
+            ),
+        ]
+
     @cached_property
     def active_race_entrant(self):
         """
@@ -131,21 +182,27 @@ class User(AbstractBaseUser, PermissionsMixin):
         in, if such a race exists.
         """
         try:
-            return self.entrant_set.filter(
-                state=EntrantStates.joined.value,
-                dnf=False,
-                dq=False,
-                finish_time__isnull=True,
-            ).exclude(race__state__in=[
-                RaceStates.finished.value,
-                RaceStates.cancelled.value,
-            ]).order_by('race__opened_at').get()
+            return self.entrant_set.active().order_by('race__opened_at').get()
         except self.entrant_set.model.DoesNotExist:
             return None
 
-    @property
-    def hashid(self):
-        return get_hashids(self.__class__).encode(self.id)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # Remember the full name as loaded, so saves can tell if it changed.
+        user._saved_full_name = (
+            user.__dict__.get('name'),
+            user.__dict__.get('discriminator'),
+        )
+        return user
+
+    @cached_property
+    def bans(self):
+        """
+        Return this user's bans as a dict, with a "global" flag for a
+        site-wide ban and the set of "categories" they are banned from.
+        """
+        return Ban.objects.for_user(self)
 
     @property
     def is_active(self):
@@ -153,7 +210,20 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     @cached_property
     def is_banned(self):
-        return self.ban_set.filter(category__isnull=True).exists()
+        return self.bans['global']
+
+    @property
+    def full_name_changed(self):
+        """
+        Determine if this user's name or discriminator has changed since it
+        was loaded or last saved (or if it has never been saved).
+        """
+        saved = getattr(self, '_saved_full_name', (None, None))
+        return (
+            self._state.adding
+            or None in saved
+            or (self.name, self.discriminator) != saved
+        )
 
     @property
     def is_system(self):
@@ -208,9 +278,20 @@ class User(AbstractBaseUser, PermissionsMixin):
         return ' '.join(flairs)
 
     def is_banned_from_category(self, category):
-        return self.ban_set.filter(
-            Q(category__isnull=True) | Q(category=category)
-        ).exists()
+        return self.is_banned or category.id in self.bans['categories']
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if hasattr(self.discriminator, 'resolve_expression'):
+            # A new discriminator was allocated by the database (see
+            # UserManager.allocate_discriminator).
+            self.refresh_from_db(fields=['discriminator'])
+        self._saved_full_name = (self.name, self.discriminator)
+        if not self.hashid:
+            # The hashid is derived from the ID, so can only be set once the
+            # object has been saved.
+            self.hashid = get_hashids(self.__class__).encode(self.id)
+            self.__class__.objects.filter(id=self.id).update(hashid=self.hashid)
 
     def get_full_name(self):
         return str(self)
@@ -234,6 +315,45 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.name
 
 
+class BanManager(models.Manager):
+    def banned_user_ids(self, category=None):
+        """
+        Return the set of IDs of users banned from the given category, or
+        banned site-wide if no category is given.
+
+        Results are cached until a ban is saved or deleted.
+        """
+        return cache.get_or_set(
+            self.model.category_key(category.id if category else None),
+            lambda: set(
+                self.filter(category=category).values_list('user_id', flat=True)
+            ),
+            settings.RT_CACHE_TIMEOUT,
+        )
+
+    def for_user(self, user):
+        """
+        Return the site-wide ban flag and set of banned category IDs for the
+        given user, as a dict. See User.bans.
+
+        Results are cached until a ban is saved or deleted.
+        """
+        def load():
+            category_ids = set(
+                self.filter(user=user).values_list('category_id', flat=True)
+            )
+            return {
+                'global': None in category_ids,
+                'categories': category_ids - {None},
+            }
+
+        return cache.get_or_set(
+            self.model.user_key(user.id),
+            load,
+            settings.RT_CACHE_TIMEOUT,
+        )
+
+
 class Ban(models.Model):
     user = models.ForeignKey(
         'User',
@@ -252,6 +372,35 @@ class Ban(models.Model):
         auto_now=True,
     )
 
+    objects = BanManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        ban = super().from_db(db, field_names, values)
+        # Remember the keys as loaded, in case the ban is moved.
+        ban._loaded_cache_keys = ban.cache_keys
+        return ban
+
+    @property
+    def cache_keys(self):
+        """
+        Return the cache keys holding ban lookups affected by this ban.
+        """
+        return [
+            self.user_key(self.user_id),
+            self.category_key(self.category_id),
+        ]
+
+    @staticmethod
+    def category_key(category_id):
+        if category_id:
+            return 'bans/category/%d' % category_id
+        return 'bans/global'
+
+    @staticmethod
+    def user_key(user_id):
+        return 'bans/user/%d' % user_id
+
 
 class UserLog(models.Model):
     user = models.ForeignKey(
@@ -0,0 +1,108 @@
+from django.db import models
+
+from ..utils import SyncError
+
+
+class VersionedModel(models.Model):
+    """
+    A model saved with optimistic concurrency control.
+
+    Saving an existing object only writes the fields that have changed since
+    it was loaded, and only if nobody else has saved it in the meantime:
+    the UPDATE is conditional on the object's version, which it increments.
+    If the row has changed (or gone), SyncError is raised and nothing is
+    written.
+
+    Queryset updates that change versioned rows should also increment the
+    version, with F('version') + 1.
+    """
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        obj._snapshot()
+        return obj
+
+    @property
+    def changed_fields(self):
+        """
+        Return the names of fields changed since this object was loaded or
+        last saved.
+        """
+        loaded = getattr(self, '_loaded_values', {})
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname in loaded
+            and getattr(self, field.attname) != loaded[field.attname]
+        ]
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        self._snapshot(fields)
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or kwargs.get('force_insert'):
+            super().save(*args, **kwargs)
+            self._snapshot()
+            return
+
+        update_fields = kwargs.pop('update_fields', None)
+        if update_fields is None:
+            update_fields = self.changed_fields
+        if not update_fields:
+            return
+        update_fields = set(update_fields) | {'version'} | {
+            field.name
+            for field in self._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        }
+
+        self._expected_version = self.version
+        self.version += 1
+        try:
+            super().save(*args, update_fields=update_fields, **kwargs)
+        except SyncError:
+            self.version = self._expected_version
+            raise
+        finally:
+            del self._expected_version
+        self._snapshot(update_fields)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update,
+            )
+        if not super()._do_update(
+            base_qs.filter(version=expected),
+            using,
+            pk_val,
+            values,
+            update_fields,
+            forced_update,
+        ):
+            raise SyncError
+        return True
+
+    def _snapshot(self, fields=None):
+        """
+        Record current field values, to tell which fields change later.
+        """
+        if not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        deferred = self.get_deferred_fields()
+        for field in self._meta.concrete_fields:
+            if fields is not None and field.name not in fields and field.attname not in fields:
+                continue
+            if field.attname not in deferred:
+                self._loaded_values[field.attname] = getattr(self, field.attname)
@@ -0,0 +1,89 @@
+from django.apps import apps
+
+__all__ = [
+    'PermissionSnapshot',
+]
+
+
+class PermissionSnapshot:
+    """
+    The permissions for a category, and optionally one of its races.
+
+    Category owner, moderators, race monitors and bans are loaded once, as
+    sets of user IDs, so checking permissions for any number of users costs
+    no further queries. Bans come from the cache (see BanManager). A
+    snapshot is held by the category or race it was made for (see
+    Category.permissions and Race.permissions), which normally lasts for one
+    request.
+    """
+    def __init__(self, category):
+        Ban = apps.get_model('racetime', 'Ban')
+
+        self.owner_id = category.owner_id
+        self.moderator_ids = set(
+            category.moderators.values_list('id', flat=True)
+        )
+        self.opened_by_id = None
+        self.monitor_ids = set()
+
+        self.banned_ids = Ban.objects.banned_user_ids()
+        self.category_banned_ids = Ban.objects.banned_user_ids(category)
+
+    def for_race(self, race):
+        """
+        Return a copy of this snapshot with the permissions for the given race
+        added to it.
+        """
+        snapshot = self.__class__.__new__(self.__class__)
+        snapshot.__dict__.update(self.__dict__)
+        snapshot.opened_by_id = race.opened_by_id
+        snapshot.monitor_ids = set(race.monitors.values_list('id', flat=True))
+        return snapshot
+
+    def is_active(self, user):
+        """
+        Determine if the user is logged in and not banned from the site.
+        """
+        return (
+            user.is_authenticated
+            and user.active
+            and user.id not in self.banned_ids
+        )
+
+    def is_banned(self, user):
+        """
+        Determine if the user is banned from the site.
+        """
+        return user.id in self.banned_ids
+
+    def is_banned_from_category(self, user):
+        return (
+            user.id in self.banned_ids
+            or user.id in self.category_banned_ids
+        )
+
+    def can_edit(self, user):
+        return self.is_active(user) and (
+            user.is_superuser
+            or user.id == self.owner_id
+        )
+
+    def can_moderate(self, user):
+        return self.is_active(user) and (
+            user.is_superuser
+            or user.id == self.owner_id
+            or user.id in self.moderator_ids
+        )
+
+    def can_monitor(self, user):
+        return self.is_active(user) and (
+            self.can_moderate(user)
+            or user.id == self.opened_by_id
+            or user.id in self.monitor_ids
+        )
+
+    def is_monitor(self, user):
+        """
+        Determine if the user has been explicitly made a race monitor.
+        """
+        return user.id in self.monitor_ids
@@ -5,17 +5,19 @@ from time import sleep
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
 from django.db.models import F
 from django.utils import timezone
 
 from . import models
-from .utils import notice_exception
+from .utils import SyncError, notice_exception
 
 
 class RaceBot:
     logger = logging.getLogger('racebot')
     pid = None
     last_adoption = None
+    last_adoption_check = None
     last_twitch_refresh = None
     races = []
     queryset = models.Race.objects.filter(
@@ -35,10 +37,19 @@ class RaceBot:
             if timezone.now() - race['last_refresh'] > timedelta(milliseconds=100):
                 race['last_refresh'] = timezone.now()
                 race['object'].refresh_from_db()
-                self.handle_race(race)
-
-        if not self.last_adoption or timezone.now() - self.last_adoption > timedelta(seconds=10):
-            self.adopt_race()
+                try:
+                    self.handle_race(race)
+                except SyncError:
+                    # Someone else changed the race while it was being
+                    # handled. It will be reloaded and tried again on the
+                    # next pass.
+                    self.logger.info(
+                        '[Race] %(race)s changed while being handled, will retry.'
+                        % {'race': race['object']}
+                    )
+
+        if self.adoption_due():
+            self.adopt_races()
             self.unorphan_races()
             self.last_adoption = timezone.now()
 
@@ -49,19 +60,46 @@ class RaceBot:
 
         sleep(0.01)
 
-    def adopt_race(self):
+    def adoption_due(self):
+        """
+        Determine if it is time to search for races to adopt.
+
+        This happens every 10 seconds, or sooner if new races have asked to be
+        adopted (see Race.ADOPTION_KEY), which is checked every second.
+        """
+        now = timezone.now()
+        if not self.last_adoption or now - self.last_adoption > timedelta(seconds=10):
+            return True
+        if not self.last_adoption_check or now - self.last_adoption_check > timedelta(seconds=1):
+            self.last_adoption_check = now
+            return bool(cache.get(models.Race.ADOPTION_KEY))
+        return False
+
+    def adopt_races(self):
         """
         Search for any orphan races this process can adopt.
 
-        The first orphaned race found will be adopted by setting the bot_pid
-        field on it to this bot's PID.
+        All orphaned races found are adopted at once, by setting the bot_pid
+        field on them to this bot's PID in a single update. Races adopted by
+        another bot in the meantime are left alone.
         """
         self.logger.debug('[Bot] Searching for races to adopt.')
 
-        race = self.queryset.filter(bot_pid=None).first()
-        if race:
-            race.bot_pid = self.pid
-            race.save()
+        cache.delete(models.Race.ADOPTION_KEY)
+        race_ids = list(
+            self.queryset.filter(bot_pid=None).values_list('id', flat=True)
+        )
+        if not race_ids:
+            return
+
+        self.queryset.filter(id__in=race_ids, bot_pid=None).update(
+            bot_pid=self.pid,
+            version=F('version') + 1,
+        )
+        for race in self.queryset.filter(
+            id__in=race_ids,
+            bot_pid=self.pid,
+        ).select_related('category'):
             self.races.append({
                 'last_refresh': timezone.now(),
                 'object': race,
@@ -93,7 +131,10 @@ class RaceBot:
                 pass
 
         if dead:
-            count = self.queryset.filter(bot_pid__in=dead).update(bot_pid=None)
+            count = self.queryset.filter(bot_pid__in=dead).update(
+                bot_pid=None,
+                version=F('version') + 1,
+            )
             self.logger.warning(
                 '[Bot] Found %(count)d orphaned race(s) from bot PID(s): %(pids)s'
                 % {'count': count, 'pids': ','.join(str(pid) for pid in dead)}
@@ -252,28 +293,33 @@ class RaceBot:
                 if stream.get('user_id')
             ]
 
-            entrants_to_update = []
+            entrants_to_update = {True: [], False: []}
             races_to_reload = []
             for twitch_id, entrants in entrants.items():
                 entrant_is_live = twitch_id in live_users
                 for entrant in entrants:
                     if entrant.stream_live != entrant_is_live:
-                        entrant.stream_live = entrant_is_live
-                        entrants_to_update.append(entrant)
+                        entrants_to_update[entrant_is_live].append(entrant.id)
                         if entrant.race not in races_to_reload:
                             races_to_reload.append(entrant.race)
 
-            if entrants_to_update:
-                models.Entrant.objects.bulk_update(
-                    entrants_to_update,
-                    ['stream_live'],
-                )
+            if races_to_reload:
+                for stream_live, entrant_ids in entrants_to_update.items():
+                    if entrant_ids:
+                        models.Entrant.objects.filter(id__in=entrant_ids).update(
+                            stream_live=stream_live,
+                            version=F('version') + 1,
+                        )
                 for race in races_to_reload:
+                    race.invalidate_caches()
                     race.add_silent_reload()
 
                 self.logger.info(
                     '[Twitch] Updated %(entrants)d entrant(s) in %(races)d race(s).'
-                    % {'entrants': len(entrants_to_update), 'races': len(races_to_reload)}
+                    % {
+                        'entrants': sum(len(ids) for ids in entrants_to_update.values()),
+                        'races': len(races_to_reload),
+                    }
                 )
             else:
                 self.logger.debug('[Twitch] All stream info is up-to-date.')
@@ -0,0 +1,164 @@
+"""
+Elo-style skill ratings for recorded races.
+
+Each race is scored as a set of head-to-head matches between every pair of
+entrants: beating an entrant scores 1, tying scores 0.5 and losing scores 0.
+An entrant's rating changes by K / (n - 1) times the sum of the differences
+between their actual and expected scores against the other n - 1 entrants,
+so a race counts the same however many people took part.
+
+When NumPy is installed, races are scored with array operations, and a
+full replay of a goal's history processes runs of consecutive races that
+share no entrants together as a single batch. Without NumPy, the same
+results are calculated one race at a time in pure Python.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = [
+    'INITIAL_RATING',
+    'K_FACTOR',
+    'rank_results',
+    'rating_changes',
+    'replay',
+]
+
+# Rating given to a user before their first recorded race.
+INITIAL_RATING = 1500.0
+# Maximum rating change from a single race.
+K_FACTOR = 32.0
+# Rating difference at which the higher rated entrant is expected to win
+# ten times as often as they lose.
+SCALE = 400.0
+
+
+def rank_results(results):
+    """
+    Turn a list of (place, finished) pairs into ranks for rating_changes.
+
+    Finishers are ranked by place. Everyone who did not finish shares the
+    rank below the last possible place.
+    """
+    last = len(results) + 1
+    return [place if finished and place else last for place, finished in results]
+
+
+def rating_changes(ratings, ranks):
+    """
+    Return the rating change for each entrant in a race, given their
+    ratings before the race and their ranks in it (lower is better).
+    """
+    if len(ratings) < 2:
+        return [0.0] * len(ratings)
+    if numpy:
+        return _numpy_rating_changes(
+            numpy.asarray(ratings, dtype=float)[numpy.newaxis],
+            numpy.asarray(ranks, dtype=float)[numpy.newaxis],
+            numpy.ones((1, len(ratings)), dtype=bool),
+        )[0].tolist()
+    return _python_rating_changes(ratings, ranks)
+
+
+def replay(races, count):
+    """
+    Calculate ratings from scratch by replaying races in order.
+
+    Races should be given as a list of (indices, ranks) pairs, where indices
+    are the positions of the race's entrants in a ratings list of the given
+    length. Returns the final ratings and, for each race, the list of rating
+    changes for its entrants.
+    """
+    if numpy:
+        return _numpy_replay(races, count)
+
+    ratings = [INITIAL_RATING] * count
+    changes = []
+    for indices, ranks in races:
+        race_changes = rating_changes([ratings[i] for i in indices], ranks)
+        for i, change in zip(indices, race_changes):
+            ratings[i] += change
+        changes.append(race_changes)
+    return ratings, changes
+
+
+def _python_rating_changes(ratings, ranks):
+    changes = []
+    for rating, rank in zip(ratings, ranks):
+        total = 0.0
+        for other_rating, other_rank in zip(ratings, ranks):
+            expected = 1 / (1 + 10 ** ((other_rating - rating) / SCALE))
+            if rank < other_rank:
+                actual = 1.0
+            elif rank > other_rank:
+                actual = 0.0
+            else:
+                actual = 0.5
+            total += actual - expected
+        changes.append(K_FACTOR / (len(ratings) - 1) * total)
+    return changes
+
+
+def _numpy_rating_changes(ratings, ranks, mask):
+    """
+    Score a batch of races at once. All arguments are arrays of shape
+    (races, entrants), padded where races have fewer entrants; mask is
+    False for padding.
+    """
+    pairs = mask[:, :, numpy.newaxis] & mask[:, numpy.newaxis, :]
+    expected = 1 / (1 + 10 ** (
+        (ratings[:, numpy.newaxis, :] - ratings[:, :, numpy.newaxis]) / SCALE
+    ))
+    actual = (numpy.sign(
+        ranks[:, numpy.newaxis, :] - ranks[:, :, numpy.newaxis]
+    ) + 1) / 2
+    totals = numpy.where(pairs, actual - expected, 0).sum(axis=2)
+    sizes = numpy.maximum(mask.sum(axis=1) - 1, 1)
+    return K_FACTOR / sizes[:, numpy.newaxis] * totals
+
+
+def _batches(races):
+    """
+    Split races into runs of consecutive races with no entrants in common.
+    Races in a run do not affect each other, so can be scored together
+    without changing the result.
+    """
+    batch = []
+    seen = set()
+    for race in races:
+        indices = race[0]
+        if seen.intersection(indices):
+            yield batch
+            batch = []
+            seen = set()
+        batch.append(race)
+        seen.update(indices)
+    if batch:
+        yield batch
+
+
+def _numpy_replay(races, count):
+    ratings = numpy.full(count, INITIAL_RATING)
+    changes = []
+    for batch in _batches(races):
+        width = max(len(indices) for indices, _ in batch)
+        index_array = numpy.zeros((len(batch), width), dtype=int)
+        rank_array = numpy.zeros((len(batch), width))
+        mask = numpy.zeros((len(batch), width), dtype=bool)
+        for row, (indices, ranks) in enumerate(batch):
+            index_array[row, :len(indices)] = indices
+            rank_array[row, :len(ranks)] = ranks
+            mask[row, :len(indices)] = True
+
+        batch_changes = _numpy_rating_changes(
+            ratings[index_array],
+            rank_array,
+            mask,
+        )
+        ratings[index_array[mask]] += batch_changes[mask]
+        changes.extend(
+            batch_changes[row, :len(indices)].tolist()
+            for row, (indices, _) in enumerate(batch)
+        )
+    return ratings.tolist(), changes
@@ -0,0 +1,241 @@
+"""
+Serializers for the race and category data payloads.
+
+The output is identical to encoding the equivalent api_dict_summary
+structures with DjangoJSONEncoder, but avoids the repeated costs that add up
+on large races: URLs are filled in from templates reversed once, user
+summaries are built once per user, and dates and durations are converted up
+front so the JSON encoder never has to call back into Python.
+"""
+import json
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.contrib.humanize.templatetags.humanize import ordinal
+from django.urls import reverse
+from django.utils.duration import duration_iso_string
+from django.utils.http import RFC3986_SUBDELIMS
+from django.utils.translation import get_language
+
+from .models.choices import RaceStates
+
+__all__ = [
+    'dump_category_data',
+    'dump_past_races',
+    'dump_race_data',
+]
+
+
+@lru_cache(maxsize=None)
+def url_template(viewname, nargs):
+    """
+    Reverse the given URL once with placeholder arguments.
+    """
+    return reverse(viewname, args=['__arg%d__' % i for i in range(nargs)])
+
+
+def fill_url(viewname, *args):
+    """
+    Return the same URL as reverse(viewname, args=args), using a cached
+    URL template.
+    """
+    url = url_template(viewname, len(args))
+    for i, arg in enumerate(args):
+        url = url.replace(
+            '__arg%d__' % i,
+            quote(str(arg), safe=RFC3986_SUBDELIMS + '/~:@'),
+        )
+    return url
+
+
+@lru_cache(maxsize=1024)
+def cached_ordinal(value, language):
+    """
+    Return ordinal(value). The active language is part of the cache key
+    because the ordinal suffix is translated.
+    """
+    return ordinal(value)
+
+
+def encode_datetime(value):
+    """
+    Encode a datetime in the same way as DjangoJSONEncoder.
+    """
+    if value is None:
+        return None
+    r = value.isoformat()
+    if value.microsecond:
+        r = r[:23] + r[26:]
+    if r.endswith('+00:00'):
+        r = r[:-6] + 'Z'
+    return r
+
+
+def encode_timedelta(value):
+    """
+    Encode a timedelta in the same way as DjangoJSONEncoder.
+    """
+    if value is None:
+        return None
+    return duration_iso_string(value)
+
+
+class UserSummaries:
+    """
+    Builds User.api_dict_summary() dicts for a payload, reusing the result
+    for users that appear more than once.
+    """
+    def __init__(self, category=None, race=None):
+        self.category = category
+        self.race = race
+        self.summaries = {}
+
+    def __call__(self, user):
+        if not user:
+            return None
+        if user.id not in self.summaries:
+            self.summaries[user.id] = {
+                'id': user.hashid,
+                'full_name': str(user),
+                'name': user.name,
+                'discriminator': user.discriminator if user.use_discriminator else None,
+                'flair': user.flair(category=self.category, race=self.race),
+                'twitch_name': user.twitch_name,
+                'twitch_channel': user.twitch_channel,
+            }
+        return self.summaries[user.id]
+
+
+def category_summary(category):
+    return {
+        'name': category.name,
+        'short_name': category.short_name,
+        'slug': category.slug,
+        'url': fill_url('category', category.slug),
+        'data_url': fill_url('category_data', category.slug),
+    }
+
+
+def status_summary(race):
+    state_info = race.state_info
+    return {
+        'value': state_info.value,
+        'verbose_value': state_info.verbose_value,
+        'help_text': state_info.help_text,
+    }
+
+
+def race_summary(race):
+    category = race.category
+    return {
+        'name': str(race),
+        'status': status_summary(race),
+        'url': fill_url('race', category.slug, race.slug),
+        'data_url': fill_url('race_data', category.slug, race.slug),
+        'goal': {
+            'name': race.goal_str,
+            'custom': not race.goal,
+        },
+        'entrants_count': race.entrants_count,
+        'entrants_count_inactive': race.entrants_count_inactive,
+        'opened_at': encode_datetime(race.opened_at),
+        'started_at': encode_datetime(race.started_at),
+        'time_limit': encode_timedelta(race.time_limit),
+    }
+
+
+def dump_race_data(race):
+    """
+    Return race data as a JSON string. See Race.dump_json_data.
+    """
+    language = get_language()
+    entrants = race.ordered_entrants
+    monitors = list(race.monitors.all())
+    user_summary = UserSummaries(race=race)
+    category = race.category
+
+    return json.dumps({
+        'name': str(race),
+        'status': status_summary(race),
+        'url': fill_url('race', category.slug, race.slug),
+        'data_url': fill_url('race_data', category.slug, race.slug),
+        'category': category_summary(category),
+        'goal': {
+            'name': race.goal_str,
+            'custom': not race.goal,
+        },
+        'info': race.info,
+        'entrants_count': race.entrants_count,
+        'entrants_count_inactive': race.entrants_count_inactive,
+        'entrants': [
+            {
+                'user': user_summary(entrant.user),
+                'status': {
+                    'value': summary[0],
+                    'verbose_value': summary[1],
+                    'help_text': summary[2],
+                },
+                'finish_time': encode_timedelta(entrant.finish_time),
+                'place': entrant.place,
+                'place_ordinal': cached_ordinal(entrant.place, language) if entrant.place else None,
+                'comment': entrant.comment,
+                'stream_live': entrant.stream_live,
+                'stream_override': entrant.stream_override,
+            }
+            for entrant, summary in ((entrant, entrant.summary) for entrant in entrants)
+        ],
+        'opened_at': encode_datetime(race.opened_at),
+        'start_delay': encode_timedelta(race.start_delay),
+        'started_at': encode_datetime(race.started_at),
+        'ended_at': encode_datetime(race.ended_at),
+        'time_limit': encode_timedelta(race.time_limit),
+        'opened_by': user_summary(race.opened_by),
+        'monitors': [user_summary(user) for user in monitors],
+        'recordable': race.recordable,
+        'recorded': race.recorded,
+        'recorded_by': user_summary(race.recorded_by),
+        'allow_comments': race.allow_comments,
+        'allow_midrace_chat': race.allow_midrace_chat,
+    })
+
+
+def dump_category_data(category):
+    """
+    Return category data as a JSON string. See Category.dump_json_data.
+    """
+    moderators = list(category.moderators.all())
+    user_summary = UserSummaries(category=category)
+
+    return json.dumps({
+        **category_summary(category),
+        'image': category.image.url if category.image else None,
+        'info': category.info,
+        'streaming_required': category.streaming_required,
+        'owner': user_summary(category.owner),
+        'moderators': [user_summary(user) for user in moderators],
+        'current_races': [
+            race_summary(race)
+            for race in category.race_set.exclude(state__in=[
+                RaceStates.finished,
+                RaceStates.cancelled,
+            ]).with_summary()
+        ],
+    })
+
+
+def dump_past_races(races, next_url=None):
+    """
+    Return a page of past races as a JSON string. See views.CategoryRacesData.
+    """
+    return json.dumps({
+        'races': [
+            {
+                **race_summary(race),
+                'ended_at': encode_datetime(race.ended_at),
+                'recordable': race.recordable,
+                'recorded': race.recorded,
+            }
+            for race in races
+        ],
+        'next_url': next_url,
+    })
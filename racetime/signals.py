@@ -1,6 +1,5 @@
-import random
-
 from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 from django.db.models import signals, Q
 from django.dispatch import receiver
 
@@ -8,26 +7,42 @@ from . import models
 
 
 @receiver(signals.pre_save, sender=models.User)
-def set_discriminator(sender, instance, **kwargs):
-    others = models.User.objects.filter(name=instance.name)
-    others = others.exclude(id=instance.id)
-
-    if instance.discriminator and not others.filter(
-        discriminator=instance.discriminator,
-    ).exists():
-        # The profile's current scrim does not conflict with any other user's
-        # profile.
+def set_discriminator(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not (
+        {'name', 'discriminator'} & set(update_fields)
+    ):
+        return
+    if instance.discriminator and not instance.full_name_changed:
         return
 
-    # Assign a random, unused scrim.
-    others = [o.discriminator for o in others.all()]
-    scrims = [i for i in range(1, 9999) if i not in others]
-    instance.discriminator = '%04d' % random.choice(scrims)
+    instance.discriminator = models.User.objects.allocate_discriminator(
+        instance.name,
+        exclude_id=instance.id,
+        preferred=instance.discriminator,
+    )
+
 
+@receiver(signals.post_save, sender=models.Race)
+def count_created_race(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        instance.category.adjust_race_counts(
+            current=1 if instance.is_current else 0,
+            total=1,
+        )
+
+
+@receiver(signals.post_delete, sender=models.Race)
+def count_deleted_race(sender, instance, **kwargs):
+    instance.category.adjust_race_counts(
+        current=-1 if instance.is_current else 0,
+        total=-1,
+    )
 
-@receiver(signals.post_save)
+
+@receiver([signals.post_save, signals.post_delete])
 def invalidate_caches(sender, instance, **kwargs):
     if sender == models.Category:
+        cache.delete(make_template_fragment_key('home_categories'))
         races = instance.race_set.all()
     elif sender == models.Entrant:
         races = [instance.race]
@@ -38,8 +53,22 @@ def invalidate_caches(sender, instance, **kwargs):
     else:
         races = []
 
-    cache.delete_many(
-        [str(race) + '/data' for race in races]
-        + [str(race) + '/renders' for race in races]
-        + [category.slug + '/data' for category in set(race.category for race in races)]
-    )
+    keys = set()
+    for race in races:
+        keys.update(race.cache_keys)
+    cache.delete_many(keys)
+
+
+@receiver([signals.post_save, signals.post_delete], sender=models.Ban)
+def invalidate_ban_caches(sender, instance, **kwargs):
+    cache.delete_many(set(
+        instance.cache_keys + getattr(instance, '_loaded_cache_keys', [])
+    ))
+    instance._loaded_cache_keys = instance.cache_keys
+
+
+@receiver(signals.m2m_changed, sender=models.Category.moderators.through)
+@receiver(signals.m2m_changed, sender=models.Race.monitors.through)
+def invalidate_permission_caches(sender, instance, action, reverse, **kwargs):
+    if action.startswith('post_') and not reverse:
+        invalidate_caches(instance.__class__, instance)
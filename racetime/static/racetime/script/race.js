@@ -36,11 +36,28 @@ $(function() {
         $messages[0].scrollTop = $messages[0].scrollHeight
     };
 
+    var hideOwnMonitorActions = function() {
+        // Entrant renders are shared by all monitors, so strip out any
+        // actions a monitor could take on themselves.
+        if (raceUser) {
+            $(this).find('li[data-user="' + raceUser + '"] .monitor-actions').remove();
+        }
+    };
+
     var ajaxifyActionForm = function() {
         $(this).ajaxForm({
             clearForm: true,
-            beforeSubmit: function() {
+            data: {
+                csrfmiddlewaretoken: raceCsrfToken,
+                inline: 1,
+                segments: 'actions,intro,monitor'
+            },
+            beforeSubmit: function(data) {
                 $('.race-action-form button').prop('disabled', true);
+                // Ask for the race state as changed since what is shown.
+                if (raceState.revision) {
+                    data.push({name: 'since', value: raceState.revision});
+                }
             },
             beforeSerialize: function($form) {
                 if ($form.hasClass('add_comment')) {
@@ -52,7 +69,15 @@ $(function() {
                 }
             },
             error: onError,
-            success: function() {
+            success: function(data, status, xhr) {
+                if (data && data.state) {
+                    var latency = getLatency(xhr);
+                    raceStateAt = getDateExact(xhr);
+                    requestAnimationFrame(function() {
+                        applyState(data.state, latency);
+                        applyRenders(data.renders, latency);
+                    });
+                }
                 chatTick();
             }
         });
@@ -71,22 +96,241 @@ $(function() {
         }
     }, 1000);
 
-    var raceTick = function() {
-        $.get(raceRendersLink, function(data, status, xhr) {
-            var latency = 0;
-            if (xhr.getResponseHeader('X-Date-Exact')) {
-                latency = new Date(xhr.getResponseHeader('X-Date-Exact')) - new Date();
+    var monitorActions = {
+        accept_request: {title: 'Accept invite', icon: 'fas fa-user-check'},
+        force_unready: {title: 'Force unready', icon: 'fas fa-clock'},
+        override_stream: {title: 'Override stream requirement', icon: 'fas fa-broadcast-tower', moderator: true},
+        remove: {title: 'Remove', icon: 'fas fa-user-slash'},
+        disqualify: {title: 'Disqualify', icon: 'fas fa-gavel', moderator: true},
+        undisqualify: {title: 'Un-disqualify', icon: 'fas fa-balance-scale', moderator: true},
+        add_monitor: {title: 'Promote to race monitor', icon: 'fas fa-id-badge'},
+        remove_monitor: {title: 'Demote from race monitor', icon: 'far fa-id-badge'}
+    };
+
+    var raceState = {
+        revision: null,
+        status: null,
+        timer: null,
+        entrants: {},
+        entrantsOrder: []
+    };
+    var entrantRows = {};
+
+    var raceIsDone = function() {
+        return raceState.status && ['finished', 'cancelled'].indexOf(raceState.status.value) !== -1;
+    };
+
+    var renderEntrant = function(id, entrant) {
+        var $li = $(
+            '<li>' +
+            '<span class="place"></span>' +
+            '<span class="user"></span>' +
+            '<span class="status"></span>' +
+            '<time class="finish-time"></time>' +
+            '</li>'
+        );
+        $li.attr('data-user', id);
+        $li.find('.place').text(entrant.place_ordinal || '—');
+
+        var $pop = $('<span class="user-pop inline"><span class="name"></span></span>');
+        $pop.addClass(entrant.user.flair);
+        if (entrant.user.avatar) {
+            $('<span class="avatar"></span>')
+                .css('background-image', 'url(' + entrant.user.avatar + ')')
+                .prependTo($pop);
+        }
+        $pop.find('.name').text(entrant.user.name);
+        if (entrant.user.discriminator) {
+            $('<span class="scrim"></span>').text('#' + entrant.user.discriminator).appendTo($pop);
+        }
+        var $user = $li.find('.user').append($pop);
+
+        if (!raceIsDone() && entrant.user.twitch_channel) {
+            var $a = $('<a target="_blank"><img alt="Twitch.tv"></a>');
+            $a.attr('href', entrant.user.twitch_channel);
+            $a.attr('title', entrant.stream_live ? 'Stream online' : 'Stream offline');
+            $a.find('img').attr('src', entrant.stream_live ? raceTwitchImage : raceTwitchOfflineImage);
+            $('<span class="stream"></span>').append($a).appendTo($user);
+        }
+        if (entrant.comment) {
+            var $comment = $('<span class="comment"><i class="fa fa-comment"></i><span class="text"></span></span>');
+            $comment.find('.text').text(entrant.comment);
+            $comment.appendTo($user);
+        }
+
+        if (raceCanMonitor && id !== raceUser) {
+            var $actions = $('<ul class="monitor-actions"></ul>');
+            entrant.monitor_actions.forEach(function(action) {
+                var info = monitorActions[action];
+                if (!info || (info.moderator && !raceCanModerate)) return;
+                var $form = $(
+                    '<li><form method="post" class="race-action-form">' +
+                    '<button type="submit" class="btn"><i></i></button>' +
+                    '</form></li>'
+                );
+                $form.find('form').attr('action', raceMonitorLink + id + '/' + action);
+                $form.find('button').attr('title', info.title);
+                $form.find('i').addClass(info.icon);
+                $actions.append($form);
+            });
+            $li.find('.status').before($actions);
+            $actions.find('.race-action-form').each(ajaxifyActionForm);
+        }
+
+        $li.find('.status')
+            .addClass(entrant.status.value)
+            .attr('title', entrant.status.help_text)
+            .text(entrant.status.verbose_value);
+        $li.find('.finish-time').text(entrant.finish_time || '—');
+
+        return $li;
+    };
+
+    var renderStatus = function(latency) {
+        var $status = $('.race-status');
+        var $timer = $('<time class="timer"></time>');
+        if (raceState.timer.started_at) {
+            $timer.attr('datetime', raceState.timer.started_at);
+        }
+        if (raceState.timer.autotick) {
+            $timer.addClass('autotick');
+        } else {
+            $timer.html(raceState.timer.html);
+        }
+        $timer.data('latency', latency);
+
+        var $state = $('<div class="state"><span class="value"></span><span class="help"></span></div>');
+        $state.find('.value').text(raceState.status.verbose_value);
+        $state.find('.help').text(raceState.status.help_text);
+
+        $status.empty().append($timer, $state);
+    };
+
+    var rerenderEntrants = function() {
+        raceState.entrantsOrder.forEach(function(id) {
+            entrantRows[id] = renderEntrant(id, raceState.entrants[id]);
+        });
+    };
+
+    var placeEntrants = function() {
+        var $list = $('.race-entrants > ol');
+        $list.children().detach();
+        raceState.entrantsOrder.forEach(function(id) {
+            $list.append(entrantRows[id]);
+        });
+        $.each(entrantRows, function(id) {
+            if (raceState.entrantsOrder.indexOf(id) === -1) {
+                delete entrantRows[id];
+                delete raceState.entrants[id];
             }
+        });
+        if (!raceState.entrantsOrder.length) {
+            $list.append('<li class="no-entrants">No race entrants.</li>');
+        }
+    };
+
+    var applyState = function(data, latency) {
+        var statusChanged = data.status && (
+            !raceState.status || raceState.status.value !== data.status.value
+        );
+        raceState.revision = data.revision;
+        if (data.status || data.timer) {
+            raceState.status = data.status || raceState.status;
+            raceState.timer = data.timer || raceState.timer;
+            renderStatus(latency);
+        }
+
+        $.each(data.entrants, function(id, entrant) {
+            raceState.entrants[id] = entrant;
+            entrantRows[id] = renderEntrant(id, entrant);
+        });
+        if (data.entrants_order) {
+            raceState.entrantsOrder = data.entrants_order;
+        }
+        if (statusChanged) {
+            // Stream links are only shown while the race is going on.
+            rerenderEntrants();
+        }
+        placeEntrants();
+
+        if (data.counts) {
+            $('.race-entrants > .count').text(
+                data.counts.entrants + ' entrant' + (data.counts.entrants === 1 ? '' : 's') +
+                ' (' + data.counts.inactive + ' inactive)'
+            );
+        }
+    };
+
+    var getDateExact = function(xhr) {
+        if (xhr.getResponseHeader('X-Date-Exact')) {
+            return new Date(xhr.getResponseHeader('X-Date-Exact'));
+        }
+        return null;
+    };
+
+    var getLatency = function(xhr) {
+        if (xhr.getResponseHeader('X-Date-Exact')) {
+            return new Date(xhr.getResponseHeader('X-Date-Exact')) - new Date();
+        }
+        return 0;
+    };
+
+    // Server time at which the shown race state was read.
+    var raceStateAt = null;
+    var stateLoading = false;
+    var stateQueued = false;
+    var stateTick = function() {
+        if (stateLoading) {
+            stateQueued = true;
+            return;
+        }
+        stateLoading = true;
+        $.get(raceStateLink, {since: raceState.revision}, function(data, status, xhr) {
+            var latency = getLatency(xhr);
+            raceStateAt = getDateExact(xhr);
             requestAnimationFrame(function() {
-                for (var segment in data) {
-                    if (!data.hasOwnProperty(segment)) continue;
-                    var $segment = $('.race-' + segment);
-                    $segment.html(data[segment]);
-                    $segment.find('time').data('latency', latency);
-                    window.localiseDates.call($segment[0]);
-                    $segment.find('.race-action-form').each(ajaxifyActionForm)
+                // Rendered blocks only change along with the race state.
+                var changed = data.revision !== raceState.revision || !!data.status;
+                applyState(data, latency);
+                if (changed) {
+                    rendersTick();
                 }
                 lastRaceTick = new Date();
+                stateLoading = false;
+                if (stateQueued) {
+                    stateQueued = false;
+                    stateTick();
+                }
+            });
+        }).fail(function() {
+            stateLoading = false;
+        });
+    };
+
+    var applyRenders = function(data, latency) {
+        for (var segment in data) {
+            if (!data.hasOwnProperty(segment)) continue;
+            var $segment = $('.race-' + segment);
+            $segment.html(data[segment]);
+            $segment.find('time').data('latency', latency);
+            window.localiseDates.call($segment[0]);
+            $segment.find('.race-action-form').each(ajaxifyActionForm)
+        }
+        // The monitor block is only rendered for race monitors.
+        if (data.hasOwnProperty('monitor') && !!data.monitor !== raceCanMonitor) {
+            raceCanMonitor = !!data.monitor;
+            if (raceState.revision) {
+                rerenderEntrants();
+                placeEntrants();
+            }
+        }
+    };
+
+    var rendersTick = function() {
+        $.get(raceRendersLink, {segments: 'actions,intro,monitor'}, function(data, status, xhr) {
+            var latency = getLatency(xhr);
+            requestAnimationFrame(function() {
+                applyRenders(data, latency);
             });
         });
     };
@@ -128,7 +372,11 @@ $(function() {
                                 $messages.append($li);
                                 doScroll = true;
                             }
-                            updateRace = true;
+                            // Changes from before the shown state was read
+                            // (such as an inline action's) are already shown.
+                            if (!raceStateAt || date > raceStateAt) {
+                                updateRace = true;
+                            }
                         }
                         else {
                             var $li = $(
@@ -157,7 +405,7 @@ $(function() {
                         $messages[0].scrollTop = $messages[0].scrollHeight
                     }
                     if (updateRace) {
-                        raceTick();
+                        stateTick();
                     }
                     chatTick(data.end, data.tick_rate);
                 },
@@ -170,6 +418,7 @@ $(function() {
 
     chatTick();
 
+    hideOwnMonitorActions.call($('.race-entrants')[0]);
     $('.race-action-form').each(ajaxifyActionForm);
 
     $('.race-chat form').ajaxForm({
@@ -0,0 +1,134 @@
+"""
+Finish time statistics for category goals.
+
+Statistics are calculated from the results of recorded races, loaded in a
+single query per goal. Finish times are sorted and summarised as arrays with
+NumPy when it is installed, otherwise in pure Python.
+"""
+import math
+from datetime import timedelta
+
+from .models.choices import EntrantStates
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = [
+    'PERCENTILES',
+    'dump_goal_stats',
+]
+
+# Finish time percentiles included in goal statistics.
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def percentiles(values, ranks):
+    """
+    Return the given percentiles of a sorted list of numbers, interpolating
+    linearly between the closest values (as numpy.percentile does).
+    """
+    if numpy:
+        return numpy.percentile(numpy.asarray(values), ranks).tolist()
+
+    results = []
+    for rank in ranks:
+        position = (len(values) - 1) * rank / 100
+        lower = math.floor(position)
+        upper = math.ceil(position)
+        results.append(
+            values[lower] + (values[upper] - values[lower]) * (position - lower)
+        )
+    return results
+
+
+def summarise(times, results):
+    """
+    Return statistics for a list of finish times (in seconds), out of the
+    given number of results.
+    """
+    if numpy:
+        times = numpy.sort(numpy.asarray(times, dtype=float))
+    else:
+        times = sorted(times)
+    summary = {
+        'results': results,
+        'finishes': len(times),
+        'dnf_rate': (results - len(times)) / results if results else None,
+        'best_time': None,
+        'mean_time': None,
+        'percentiles': {str(rank): None for rank in PERCENTILES},
+    }
+    if len(times):
+        summary.update({
+            'best_time': float(times[0]),
+            'mean_time': float(times.mean()) if numpy else sum(times) / len(times),
+            'percentiles': dict(zip(
+                (str(rank) for rank in PERCENTILES),
+                percentiles(times, PERCENTILES),
+            )),
+        })
+    return summary
+
+
+def dump_goal_stats(goal):
+    """
+    Return finish time statistics for a goal as a dict, overall and for
+    each month in which races were recorded. Times are given as timedeltas.
+    """
+    Entrant = goal._meta.apps.get_model('racetime', 'Entrant')
+    results = Entrant.objects.filter(
+        race__goal=goal,
+        race__recorded=True,
+        state=EntrantStates.joined.value,
+    ).order_by('race__ended_at').values_list(
+        'race_id', 'race__ended_at', 'finish_time', 'dnf', 'dq',
+    )
+
+    races = set()
+    times = []
+    total = 0
+    months = {}
+    for race_id, ended_at, finish_time, dnf, dq in results:
+        races.add(race_id)
+        total += 1
+        month = months.setdefault(
+            '%04d-%02d' % (ended_at.year, ended_at.month),
+            ([], []),
+        )
+        month[1].append(race_id)
+        if finish_time is not None and not dnf and not dq:
+            times.append(finish_time.total_seconds())
+            month[0].append(finish_time.total_seconds())
+
+    return {
+        'races': len(races),
+        **to_timedeltas(summarise(times, total)),
+        'months': [
+            {
+                'month': month,
+                'races': len(set(month_results)),
+                **to_timedeltas(summarise(month_times, len(month_results))),
+            }
+            for month, (month_times, month_results) in months.items()
+        ],
+    }
+
+
+def to_timedeltas(summary):
+    """
+    Convert the times in a summary from seconds to timedeltas.
+    """
+    def convert(seconds):
+        return timedelta(seconds=seconds) if seconds is not None else None
+
+    return {
+        **summary,
+        'best_time': convert(summary['best_time']),
+        'mean_time': convert(summary['mean_time']),
+        'percentiles': {
+            rank: convert(seconds)
+            for rank, seconds in summary['percentiles'].items()
+        },
+    }
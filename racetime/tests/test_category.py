@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from racetime import forms, models
+
+
+class EditCategoryTestCase(TestCase):
+    def setUp(self):
+        self.owner = models.User.objects.create_user(
+            email='owner@racetime.gg',
+            password='pass',
+            name='Owner',
+        )
+        self.category = models.Category.objects.create(
+            name='Test Category',
+            short_name='TC',
+            slug='tc',
+            owner=self.owner,
+        )
+        self.goal = models.Goal.objects.create(
+            category=self.category,
+            name='Any%',
+        )
+        self.client.force_login(self.owner)
+
+    def open_race(self):
+        return models.Race.objects.create(
+            category=self.category,
+            goal=self.goal,
+            slug=self.category.generate_race_slug(),
+            opened_by=self.owner,
+        )
+
+    def test_edit_keeps_race_counts(self):
+        self.open_race()
+        original_clean_info = forms.CategoryForm.clean_info
+
+        def clean_info(form):
+            # Another race is opened after the view has loaded the category,
+            # but before the edit is saved.
+            self.open_race()
+            return original_clean_info(form)
+
+        with mock.patch.object(forms.CategoryForm, 'clean_info', clean_info):
+            resp = self.client.post(reverse('edit_category', args=('tc',)), {
+                'name': 'Renamed Category',
+                'short_name': 'TC',
+                'info': '',
+                'slug_words': '',
+                'active_goals': [self.goal.id],
+                'add_new_goals': '',
+            })
+        self.assertEqual(resp.status_code, 302)
+
+        category = models.Category.objects.get(id=self.category.id)
+        self.assertEqual(category.name, 'Renamed Category')
+        self.assertEqual(category.current_race_count, 2)
+        self.assertEqual(category.total_race_count, 2)
@@ -0,0 +1,75 @@
+import gzip
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from racetime import models
+from racetime.utils import payload_encodings
+from racetime.views.base import parse_accept_encoding
+
+
+class ParseAcceptEncodingTestCase(TestCase):
+    def test_parse(self):
+        self.assertEqual(
+            parse_accept_encoding('gzip, deflate;q=0.5, BR;q=0, *;q=0.1'),
+            {'gzip': 1.0, 'deflate': 0.5, 'br': 0.0, '*': 0.1},
+        )
+
+    def test_empty(self):
+        self.assertEqual(parse_accept_encoding(''), {})
+
+
+class PayloadResponseTestCase(TestCase):
+    def setUp(self):
+        owner = models.User.objects.create_user(
+            email='owner@racetime.gg',
+            password='pass',
+            name='Owner',
+        )
+        self.category = models.Category.objects.create(
+            name='Test Category',
+            short_name='TC',
+            slug='tc',
+            owner=owner,
+        )
+        cache.clear()
+        self.category.dump_json_data()
+        self.url = reverse('category_data', args=(self.category.slug,))
+
+    def tearDown(self):
+        cache.clear()
+
+    def get(self, accept_encoding):
+        return self.client.get(self.url, HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def test_accepted_encoding_is_served(self):
+        resp = self.get('gzip, deflate')
+
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(resp.content).decode(),
+            self.category.json_data,
+        )
+
+    def test_wildcard_encoding_is_served(self):
+        self.assertEqual(
+            self.get('*')['Content-Encoding'],
+            payload_encodings()[0][0],
+        )
+
+    def test_refused_encoding_is_not_served(self):
+        for accept_encoding in (
+            '',
+            'gzip;q=0',
+            'gzip; q=0.0, br;q=0',
+            '*;q=0',
+            '*, gzip;q=0, br;q=0',
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                resp = self.get(accept_encoding)
+                self.assertFalse(resp.has_header('Content-Encoding'))
+                self.assertEqual(
+                    resp.content.decode(),
+                    self.category.json_data,
+                )
@@ -0,0 +1,125 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from racetime import models
+
+
+class EntrantActionTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = models.User.objects.create_user(
+            email='owner@racetime.gg',
+            password='pass',
+            name='Owner',
+        )
+        cls.outsider = models.User.objects.create_user(
+            email='outsider@racetime.gg',
+            password='pass',
+            name='Outsider',
+        )
+        cls.invitee = models.User.objects.create_user(
+            email='invitee@racetime.gg',
+            password='pass',
+            name='Invitee',
+        )
+        category = models.Category.objects.create(
+            name='Test Category',
+            short_name='TC',
+            slug='tc',
+            owner=cls.owner,
+        )
+        cls.race = models.Race.objects.create(
+            category=category,
+            custom_goal='Custom goal',
+            slug='invite-only-1234',
+            state=models.RaceStates.invitational.value,
+            opened_by=cls.owner,
+        )
+        models.Entrant.objects.create(
+            race=cls.race,
+            user=cls.invitee,
+            state=models.EntrantStates.invited.value,
+        )
+
+    def remove(self, hashid):
+        return self.client.post(reverse('remove', kwargs={
+            'category': self.race.category.slug,
+            'race': self.race.slug,
+            'entrant': hashid,
+        }))
+
+    def test_non_monitor_cannot_probe_entrants(self):
+        self.client.force_login(self.outsider)
+
+        self.assertEqual(self.remove(self.invitee.hashid).status_code, 403)
+        self.assertEqual(self.remove(self.outsider.hashid).status_code, 403)
+
+    def test_monitor_gets_404_for_unknown_entrant(self):
+        self.client.force_login(self.owner)
+
+        self.assertEqual(self.remove(self.outsider.hashid).status_code, 404)
+
+
+class BulkEntrantActionTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = models.User.objects.create_user(
+            email='owner@racetime.gg',
+            password='pass',
+            name='Owner',
+        )
+        cls.entrant = models.User.objects.create_user(
+            email='entrant@racetime.gg',
+            password='pass',
+            name='Entrant',
+        )
+        category = models.Category.objects.create(
+            name='Test Category',
+            short_name='TC',
+            slug='tc',
+            owner=cls.owner,
+        )
+        cls.race = models.Race.objects.create(
+            category=category,
+            custom_goal='Custom goal',
+            slug='bulk-action-1234',
+            state=models.RaceStates.open.value,
+            opened_by=cls.owner,
+        )
+        models.Entrant.objects.create(race=cls.race, user=cls.entrant)
+
+    def bulk_action(self, action):
+        return self.client.post(
+            reverse('bulk_entrant_action', kwargs={
+                'category': self.race.category.slug,
+                'race': self.race.slug,
+                'action': action,
+            }),
+            {'entrants': [self.entrant.hashid]},
+        )
+
+    def test_inapplicable_action_is_not_a_sync_error(self):
+        self.client.force_login(self.owner)
+
+        resp = self.bulk_action('force_unready')
+
+        self.assertEqual(resp.status_code, 422)
+        self.assertEqual(
+            resp.content.decode(),
+            'That action does not apply to any of the selected entrants.',
+        )
+        self.assertTrue(models.Entrant.objects.filter(
+            race=self.race,
+            user=self.entrant,
+        ).exists())
+
+    def test_applicable_action(self):
+        self.client.force_login(self.owner)
+
+        resp = self.bulk_action('remove')
+
+        self.assertEqual(resp.status_code, 302)
+        self.assertFalse(models.Entrant.objects.filter(
+            race=self.race,
+            user=self.entrant,
+        ).exists())
@@ -0,0 +1,259 @@
+import json
+from datetime import timedelta
+
+from django.contrib.humanize.templatetags.humanize import ordinal
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase
+from django.utils import timezone
+
+from racetime import models
+from racetime.serializers import (
+    dump_category_data,
+    dump_past_races,
+    dump_race_data,
+)
+
+
+def legacy_race_summary(race):
+    return {
+        'name': str(race),
+        'status': {
+            'value': race.state_info.value,
+            'verbose_value': race.state_info.verbose_value,
+            'help_text': race.state_info.help_text,
+        },
+        'url': race.get_absolute_url(),
+        'data_url': race.get_data_url(),
+        'goal': {
+            'name': race.goal_str,
+            'custom': not race.goal,
+        },
+        'entrants_count': race.entrants_count,
+        'entrants_count_inactive': race.entrants_count_inactive,
+        'opened_at': race.opened_at,
+        'started_at': race.started_at,
+        'time_limit': race.time_limit,
+    }
+
+
+def legacy_race_data(race):
+    """
+    Race data as Race.dump_json_data encoded it before racetime.serializers.
+    """
+    return json.dumps({
+        'name': str(race),
+        'status': {
+            'value': race.state_info.value,
+            'verbose_value': race.state_info.verbose_value,
+            'help_text': race.state_info.help_text,
+        },
+        'url': race.get_absolute_url(),
+        'data_url': race.get_data_url(),
+        'category': race.category.api_dict_summary(),
+        'goal': {
+            'name': race.goal_str,
+            'custom': not race.goal,
+        },
+        'info': race.info,
+        'entrants_count': race.entrants_count,
+        'entrants_count_inactive': race.entrants_count_inactive,
+        'entrants': [
+            {
+                'user': entrant.user.api_dict_summary(race=race),
+                'status': {
+                    'value': entrant.summary[0],
+                    'verbose_value': entrant.summary[1],
+                    'help_text': entrant.summary[2],
+                },
+                'finish_time': entrant.finish_time,
+                'place': entrant.place,
+                'place_ordinal': ordinal(entrant.place) if entrant.place else None,
+                'comment': entrant.comment,
+                'stream_live': entrant.stream_live,
+                'stream_override': entrant.stream_override,
+            }
+            for entrant in race.ordered_entrants
+        ],
+        'opened_at': race.opened_at,
+        'start_delay': race.start_delay,
+        'started_at': race.started_at,
+        'ended_at': race.ended_at,
+        'time_limit': race.time_limit,
+        'opened_by': race.opened_by.api_dict_summary(race=race),
+        'monitors': [user.api_dict_summary(race=race) for user in race.monitors.all()],
+        'recordable': race.recordable,
+        'recorded': race.recorded,
+        'recorded_by': race.recorded_by.api_dict_summary(race=race) if race.recorded_by else None,
+        'allow_comments': race.allow_comments,
+        'allow_midrace_chat': race.allow_midrace_chat,
+    }, cls=DjangoJSONEncoder)
+
+
+def legacy_category_data(category):
+    """
+    Category data as Category.dump_json_data encoded it before
+    racetime.serializers.
+    """
+    return json.dumps({
+        **category.api_dict_summary(),
+        'image': category.image.url if category.image else None,
+        'info': category.info,
+        'streaming_required': category.streaming_required,
+        'owner': category.owner.api_dict_summary(category=category),
+        'moderators': [user.api_dict_summary(category=category) for user in category.moderators.all()],
+        'current_races': [
+            legacy_race_summary(race)
+            for race in category.race_set.exclude(state__in=[
+                models.RaceStates.finished,
+                models.RaceStates.cancelled,
+            ]).all()
+        ],
+    }, cls=DjangoJSONEncoder)
+
+
+def legacy_past_races(races, next_url=None):
+    return json.dumps({
+        'races': [
+            {
+                **legacy_race_summary(race),
+                'ended_at': race.ended_at,
+                'recordable': race.recordable,
+                'recorded': race.recorded,
+            }
+            for race in races
+        ],
+        'next_url': next_url,
+    }, cls=DjangoJSONEncoder)
+
+
+class SerializerTestCase(TestCase):
+    """
+    The serializers must produce exactly the same bytes as the
+    DjangoJSONEncoder payloads they replaced.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            models.User.objects.create_user(
+                email='user%d@racetime.gg' % i,
+                password='pass',
+                name='User %d' % i,
+                twitch_name='user%d' % i if i % 2 else None,
+            )
+            for i in range(8)
+        ]
+        users[7].is_staff = True
+        users[7].save()
+
+        cls.category = models.Category.objects.create(
+            name='Test Category',
+            short_name='TC',
+            slug='tc',
+            owner=users[0],
+            info='Category information',
+        )
+        cls.category.moderators.add(users[1])
+        goal = models.Goal.objects.create(category=cls.category, name='Any%')
+
+        now = timezone.now().replace(microsecond=123456)
+        open_race = models.Race.objects.create(
+            category=cls.category,
+            goal=goal,
+            slug='open-race-1234',
+            state=models.RaceStates.open.value,
+            opened_by=users[0],
+            info='Race information',
+        )
+        open_race.monitors.add(users[2])
+        models.Entrant.objects.create(race=open_race, user=users[2], ready=True)
+        models.Entrant.objects.create(race=open_race, user=users[3])
+        models.Entrant.objects.create(
+            race=open_race,
+            user=users[4],
+            state=models.EntrantStates.invited.value,
+        )
+
+        in_progress_race = models.Race.objects.create(
+            category=cls.category,
+            custom_goal='Custom goal',
+            slug='in-progress-race-5678',
+            state=models.RaceStates.in_progress.value,
+            opened_by=users[7],
+            started_at=now,
+            recordable=False,
+        )
+        models.Entrant.objects.create(race=in_progress_race, user=users[5], ready=True)
+        models.Entrant.objects.create(
+            race=in_progress_race,
+            user=users[6],
+            ready=True,
+            finish_time=timedelta(hours=1, microseconds=500),
+            place=1,
+        )
+
+        for i, recorded in enumerate((True, False)):
+            race = models.Race.objects.create(
+                category=cls.category,
+                goal=goal,
+                slug='finished-race-%d' % i,
+                state=models.RaceStates.finished.value,
+                opened_by=users[1],
+                started_at=now - timedelta(hours=2),
+                ended_at=now - timedelta(minutes=i),
+                recorded=recorded,
+                recorded_by=users[1] if recorded else None,
+            )
+            models.Entrant.objects.create(
+                race=race,
+                user=users[2],
+                ready=True,
+                finish_time=timedelta(hours=1, minutes=2, seconds=3, microseconds=456789),
+                place=1,
+                comment='GG',
+            )
+            models.Entrant.objects.create(
+                race=race,
+                user=users[3],
+                ready=True,
+                finish_time=timedelta(hours=1, minutes=30),
+                place=2,
+                stream_override=True,
+            )
+            models.Entrant.objects.create(race=race, user=users[4], ready=True, dnf=True)
+            models.Entrant.objects.create(race=race, user=users[5], ready=True, dq=True)
+
+        models.Race.objects.create(
+            category=cls.category,
+            goal=goal,
+            slug='cancelled-race-0000',
+            state=models.RaceStates.cancelled.value,
+            opened_by=users[0],
+            ended_at=now,
+        )
+
+    def test_race_data(self):
+        for race in self.category.race_set.all():
+            with self.subTest(race=race.slug):
+                race = models.Race.objects.get(id=race.id)
+                expected = legacy_race_data(race)
+                race = models.Race.objects.get(id=race.id)
+                self.assertEqual(dump_race_data(race), expected)
+
+    def test_category_data(self):
+        category = models.Category.objects.get(id=self.category.id)
+        expected = legacy_category_data(category)
+        category = models.Category.objects.get(id=self.category.id)
+        self.assertEqual(dump_category_data(category), expected)
+
+    def test_past_races(self):
+        races = self.category.race_set.filter(
+            state__in=[
+                models.RaceStates.finished.value,
+                models.RaceStates.cancelled.value,
+            ],
+        ).order_by('-ended_at', '-id')
+        next_url = '/tc/races/data?before=1'
+        self.assertEqual(
+            dump_past_races(races.with_summary(), next_url),
+            legacy_past_races(races.all(), next_url),
+        )
@@ -0,0 +1,126 @@
+from unittest import mock
+
+from django.db.models import signals
+from django.test import TestCase
+from django.urls import reverse
+
+from racetime import models
+
+
+class EditAccountTestCase(TestCase):
+    def setUp(self):
+        self.user = models.User.objects.create_user(
+            email='old@racetime.gg',
+            password='pass',
+            name='Old Name',
+        )
+        self.client.force_login(self.user)
+
+    def edit_account(self, **data):
+        return self.client.post(reverse('edit_account'), {
+            'email': self.user.email,
+            'name': self.user.name,
+            'update_account': '1',
+            **data,
+        })
+
+    def test_name_change_logs_previous_details(self):
+        resp = self.edit_account(name='New Name')
+        self.assertRedirects(resp, reverse('edit_account'))
+
+        log = models.UserLog.objects.get(user=self.user)
+        self.assertEqual(log.email, 'old@racetime.gg')
+        self.assertEqual(log.name, 'Old Name')
+        self.assertEqual(log.discriminator, self.user.discriminator)
+
+        user = models.User.objects.get(id=self.user.id)
+        self.assertEqual(user.name, 'New Name')
+        self.assertTrue(user.discriminator)
+
+    def test_email_change_logs_previous_details(self):
+        self.edit_account(email='new@racetime.gg')
+
+        log = models.UserLog.objects.get(user=self.user)
+        self.assertEqual(log.email, 'old@racetime.gg')
+        self.assertEqual(log.name, 'Old Name')
+        self.assertEqual(
+            models.User.objects.get(id=self.user.id).email,
+            'new@racetime.gg',
+        )
+
+    def test_unchanged_details_are_not_logged(self):
+        self.edit_account()
+
+        self.assertFalse(models.UserLog.objects.filter(user=self.user).exists())
+
+
+class DiscriminatorTestCase(TestCase):
+    def setUp(self):
+        self.user = models.User.objects.create_user(
+            email='first@racetime.gg',
+            password='pass',
+            name='Racer',
+            discriminator='1234',
+        )
+
+    def create_racer(self, **extra_fields):
+        return models.User.objects.create_user(
+            email='second@racetime.gg',
+            password='pass',
+            name='Racer',
+            **extra_fields,
+        )
+
+    def test_free_preferred_discriminator_is_kept(self):
+        user = self.create_racer(discriminator='5678')
+
+        self.assertEqual(user.discriminator, '5678')
+
+    def test_taken_preferred_discriminator_is_replaced(self):
+        user = self.create_racer(discriminator='1234')
+
+        self.assertRegex(user.discriminator, r'^\d{4}$')
+        self.assertNotEqual(user.discriminator, '1234')
+        self.assertEqual(
+            models.User.objects.get(id=user.id).discriminator,
+            user.discriminator,
+        )
+
+    def test_discriminator_is_chosen_when_saved(self):
+        def take_discriminator(sender, instance, **kwargs):
+            # Another signup takes the value after this user's discriminator
+            # was allocated, but before this user is saved.
+            models.User.objects.filter(id=self.user.id).update(
+                discriminator='5678',
+            )
+
+        signals.pre_save.connect(take_discriminator, sender=models.User)
+        try:
+            user = self.create_racer(discriminator='5678')
+        finally:
+            signals.pre_save.disconnect(take_discriminator, sender=models.User)
+
+        self.assertRegex(user.discriminator, r'^\d{4}$')
+        self.assertNotEqual(user.discriminator, '5678')
+
+    def test_rename_allocates_discriminator(self):
+        user = self.create_racer(discriminator='5678')
+        user.name = 'Other'
+        user.discriminator = None
+        user.save()
+
+        self.assertRegex(user.discriminator, r'^\d{4}$')
+        self.assertEqual(
+            models.User.objects.get(id=user.id).discriminator,
+            user.discriminator,
+        )
+
+    def test_unchanged_name_is_not_reallocated(self):
+        user = models.User.objects.get(id=self.user.id)
+        with mock.patch.object(
+            models.User.objects,
+            'allocate_discriminator',
+        ) as mocked:
+            user.save()
+        mocked.assert_not_called()
+        self.assertEqual(user.discriminator, '1234')
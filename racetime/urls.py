@@ -21,8 +21,13 @@ urlpatterns = [
     path('<str:category>', views.Category.as_view(), name='category'),
     path('<str:category>/', include([
         path('data', views.CategoryData.as_view(), name='category_data'),
+        path('stats', views.CategoryStats.as_view(), name='category_stats'),
         path('edit', views.EditCategory.as_view(), name='edit_category'),
+        path('leaderboards', views.CategoryLeaderboards.as_view(), name='category_leaderboards'),
+        path('races', views.CategoryRaces.as_view(), name='category_races'),
+        path('races/data', views.CategoryRacesData.as_view(), name='category_races_data'),
         path('startrace', views.CreateRace.as_view(), name='create_race'),
+        path('startrace/batch', views.CreateRaceBatch.as_view(), name='create_race_batch'),
     ])),
 
     path('<str:category>/<str:race>', views.Race.as_view(), name='race'),
@@ -30,6 +35,7 @@ urlpatterns = [
         path('chat', views.RaceChat.as_view(), name='race_chat'),
         path('data', views.RaceData.as_view(), name='race_data'),
         path('renders', views.RaceRenders.as_view(), name='race_renders'),
+        path('state', views.RaceState.as_view(), name='race_state'),
 
         path('message', views.Message.as_view(), name='message'),
         path('join', views.Join.as_view(), name='join'),
@@ -51,8 +57,10 @@ urlpatterns = [
             path('begin', views.BeginRace.as_view(), name='begin_race'),
             path('cancel', views.CancelRace.as_view(), name='cancel_race'),
             path('invite', views.InviteToRace.as_view(), name='invite_to_race'),
+            path('invite/bulk', views.BulkInviteToRace.as_view(), name='bulk_invite_to_race'),
             path('record', views.RecordRace.as_view(), name='record_race'),
             path('unrecord', views.UnrecordRace.as_view(), name='unrecord_race'),
+            path('bulk/<str:action>', views.BulkEntrantAction.as_view(), name='bulk_entrant_action'),
 
             path('<str:entrant>/', include([
                 path('accept_request', views.AcceptRequest.as_view(), name='accept_request'),
@@ -1,13 +1,25 @@
+import gzip
 import random
+from functools import lru_cache
 
 from django.conf import settings
+from django.core.cache import cache
 from django.utils.module_loading import import_string
 from hashids import Hashids
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 __all__ = [
     'SafeException',
+    'SyncError',
+    'cache_payload',
     'generate_race_slug',
     'get_hashids',
+    'payload_keys',
+    'race_slug_space',
     'timer_html',
     'timer_str',
 ]
@@ -194,6 +206,54 @@ class SafeException(Exception):
     pass
 
 
+class SyncError(SafeException):
+    """
+    Raised when an action was based on out of date information, for example
+    because the object it saves has been changed by someone else since it
+    was loaded.
+    """
+    def __init__(self, message='Possible sync error. Refresh to continue.'):
+        super().__init__(message)
+
+
+def cache_payload(key, value, timeout=None):
+    """
+    Store a JSON payload in the cache, along with pre-compressed variants of
+    it for each supported content encoding.
+
+    The variants are stored under the same key with the encoding name
+    appended, e.g. "oot/some-race-1234/data.gzip".
+    """
+    data = value.encode()
+    cache.set_many({
+        key: value,
+        **{
+            key + '.' + encoding: compress(data)
+            for encoding, compress in payload_encodings()
+        },
+    }, timeout)
+
+
+def payload_encodings():
+    """
+    Return a list of (content encoding, compress function) pairs supported
+    for cached payloads, in order of preference. Brotli is only used if the
+    brotli package is installed.
+    """
+    encodings = []
+    if brotli:
+        encodings.append(('br', brotli.compress))
+    encodings.append(('gzip', gzip.compress))
+    return encodings
+
+
+def payload_keys(key):
+    """
+    Return all cache keys used to store the given payload with cache_payload.
+    """
+    return [key] + [key + '.' + encoding for encoding, _ in payload_encodings()]
+
+
 def generate_race_slug(custom_nouns=None):
     return '-'.join([
         random.choice(slug_adjectives),
@@ -202,9 +262,24 @@ def generate_race_slug(custom_nouns=None):
     ])
 
 
+def race_slug_space(custom_nouns=None):
+    """
+    Return the number of distinct slugs generate_race_slug can produce.
+    """
+    return (
+        len(set(slug_adjectives))
+        * len(set(custom_nouns if custom_nouns else slug_nouns))
+        * 9999
+    )
+
+
+@lru_cache(maxsize=None)
 def get_hashids(cls):
     """
     Return a Hashids object for generating hashids scoped to the given class.
+
+    Only one object is created per class. Models store their hashid once it
+    has been generated, so this is mostly needed when saving new objects.
     """
     return Hashids(salt=str(cls) + settings.SECRET_KEY, min_length=16)
 
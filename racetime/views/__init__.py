@@ -6,14 +6,25 @@ from .auth import (
     PasswordResetConfirmView,
     PasswordResetCompleteView,
 )
-from .category import Category, CategoryData, RequestCategory, EditCategory
+from .category import (
+    Category,
+    CategoryData,
+    CategoryLeaderboards,
+    CategoryRaces,
+    CategoryRacesData,
+    CategoryStats,
+    RequestCategory,
+    EditCategory,
+)
 from .home import Home
 from .race import (
     Race,
     RaceData,
     RaceRenders,
+    RaceState,
     RaceChat,
     CreateRace,
+    CreateRaceBatch,
     EditRace,
 )
 from .race_actions import (
@@ -36,6 +47,7 @@ from .race_monitor_actions import (
     BeginRace,
     CancelRace,
     InviteToRace,
+    BulkInviteToRace,
     RecordRace,
     UnrecordRace,
     AcceptRequest,
@@ -46,6 +58,7 @@ from .race_monitor_actions import (
     Undisqualify,
     AddMonitor,
     RemoveMonitor,
+    BulkEntrantAction,
 )
 from .user import CreateAccount, EditAccount, TwitchAuth
 
@@ -60,17 +73,23 @@ __all__ = [
     # category
     'Category',
     'CategoryData',
+    'CategoryLeaderboards',
+    'CategoryRaces',
+    'CategoryRacesData',
+    'CategoryStats',
     'EditCategory',
     'RequestCategory',
     # home
     'Home',
     # race
     'CreateRace',
+    'CreateRaceBatch',
     'EditRace',
     'Race',
     'RaceChat',
     'RaceData',
     'RaceRenders',
+    'RaceState',
     # race_actions
     'Message',
     'Join',
@@ -90,6 +109,7 @@ __all__ = [
     'BeginRace',
     'CancelRace',
     'InviteToRace',
+    'BulkInviteToRace',
     'RecordRace',
     'UnrecordRace',
     'AcceptRequest',
@@ -100,6 +120,7 @@ __all__ = [
     'Undisqualify',
     'AddMonitor',
     'RemoveMonitor',
+    'BulkEntrantAction',
     # user
     'CreateAccount',
     'EditAccount',
@@ -1,17 +1,90 @@
 from django.contrib.auth.mixins import UserPassesTestMixin
-from django.http import HttpResponse, HttpResponseRedirect
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from django.views import generic
 
-from ..models import User, Race
-from ..utils import SafeException
+from ..models import Race
+from ..utils import SafeException, payload_encodings
+
+
+def split_segments(segments):
+    """
+    Return a list of the race render segments named in a comma-separated
+    string, or None (meaning all segments) if the string is empty.
+    """
+    if not segments:
+        return None
+    return segments.split(',')
+
+
+def parse_accept_encoding(accept_encoding):
+    """
+    Return a dict of the content codings named in an Accept-Encoding header
+    value, mapped to their q-values.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+class PayloadMixin:
+    def payload_response(self, key, get_value):
+        """
+        Return an HttpResponse for a JSON payload cached with cache_payload.
+
+        If the client accepts one of the pre-compressed variants and it is in
+        the cache, that variant is served as-is. Otherwise get_value is
+        called to fetch (or rebuild) the raw payload.
+        """
+        qualities = parse_accept_encoding(
+            self.request.META.get('HTTP_ACCEPT_ENCODING', ''),
+        )
+        for encoding, _ in payload_encodings():
+            # Codings with a q-value of 0 are refused by the client.
+            if qualities.get(encoding, qualities.get('*', 0)) <= 0:
+                continue
+            content = cache.get(key + '.' + encoding)
+            if content is not None:
+                resp = HttpResponse(
+                    content=content,
+                    content_type='application/json',
+                )
+                resp['Content-Encoding'] = encoding
+                break
+        else:
+            resp = HttpResponse(
+                content=get_value(),
+                content_type='application/json',
+            )
+        patch_vary_headers(resp, ('Accept-Encoding',))
+        return resp
 
 
 class UserMixin:
     @property
     def user(self):
-        if self.request.user.is_authenticated:
-            return User.objects.get(id=self.request.user.id)
+        """
+        Return the current user.
+
+        This is the same object the authentication middleware loaded, so it
+        (and anything cached on it) is shared by the whole request.
+        """
         return self.request.user
 
 
@@ -44,7 +117,7 @@ class BaseRaceAction(UserMixin, generic.View):
             race_slug = self.kwargs.get('race')
 
             self._race = get_object_or_404(
-                Race.objects,
+                Race.objects.select_related('category'),
                 category__slug=category_slug,
                 slug=race_slug,
             )
@@ -57,8 +130,37 @@ class BaseRaceAction(UserMixin, generic.View):
             return HttpResponse(str(ex), status=422)
 
         if self.request.is_ajax():
-            return HttpResponse()
+            return self.ajax_response()
         return HttpResponseRedirect(self.get_race().get_absolute_url())
 
+    def ajax_response(self):
+        """
+        Return the response to a successful AJAX action.
+
+        If the request includes an "inline" field, the response carries the
+        race state (as changed since the "since" revision, if given) and the
+        acting user's renders (limited to "segments", if given), so the page
+        can show the result without polling for it. Otherwise the response
+        is empty.
+        """
+        if not self.request.POST.get('inline'):
+            return HttpResponse()
+
+        # Stamp the response before reading the state, so anything that
+        # happens to the race afterwards is known to be newer than it.
+        now = timezone.now()
+        race = self.get_race()
+        race.refresh_from_db()
+        resp = JsonResponse({
+            'state': race.get_state_diff(self.request.POST.get('since')),
+            'renders': race.get_renders(
+                self.user,
+                self.request,
+                split_segments(self.request.POST.get('segments')),
+            ),
+        })
+        resp['X-Date-Exact'] = now.isoformat()
+        return resp
+
     def _do_action(self):
         self.action(self.get_race(), self.user)
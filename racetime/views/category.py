@@ -1,14 +1,41 @@
+from datetime import datetime, timedelta
+
 from django.contrib import messages
 from django.contrib.auth.mixins import UserPassesTestMixin, LoginRequiredMixin
 from django.db import models as db_models
 from django.db.transaction import atomic
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
 from django.urls import reverse
 from django.utils import timezone
 from django.views import generic
 
-from .base import UserMixin
+from .base import PayloadMixin, UserMixin
 from .. import forms, models
+from ..serializers import dump_past_races
+
+CURSOR_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(race):
+    """
+    Return a pagination cursor pointing just past the given race.
+    """
+    return '%d_%d' % (
+        (race.ended_at - CURSOR_EPOCH) // timedelta(microseconds=1),
+        race.id,
+    )
+
+
+def decode_cursor(cursor):
+    """
+    Return the (ended_at, id) pair for a pagination cursor. Raises ValueError
+    if the cursor is not valid.
+    """
+    ended_at, race_id = cursor.split('_')
+    return (
+        CURSOR_EPOCH + timedelta(microseconds=int(ended_at)),
+        int(race_id),
+    )
 
 
 class Category(UserMixin, generic.DetailView):
@@ -17,15 +44,19 @@ class Category(UserMixin, generic.DetailView):
     queryset = models.Category.objects.filter(
         active=True,
     )
+    # How many past races to show at once.
+    past_races_per_page = 20
 
     def get_context_data(self, **kwargs):
+        past_races, next_cursor = self.past_races()
         return {
             **super().get_context_data(**kwargs),
             'can_edit': self.object.can_edit(self.user),
             'can_moderate': self.object.can_moderate(self.user),
             'can_start_race': self.object.can_start_race(self.user),
             'current_races': self.current_races(),
-            'past_races': self.past_races(),
+            'past_races': past_races,
+            'more_past_races': next_cursor is not None,
             'meta_image': self.request.build_absolute_uri(self.object.image.url) if self.object.image else None,
         }
 
@@ -33,20 +64,23 @@ class Category(UserMixin, generic.DetailView):
         return self.object.race_set.exclude(state__in=[
             models.RaceStates.finished,
             models.RaceStates.cancelled,
-        ]).annotate(
+        ]).with_summary().annotate(
             state_sort=db_models.Case(
                 # Open/Invitational
                 db_models.When(
-                    state__in=[models.RaceStates.open, models.RaceStates.invitational],
+                    state__in=[
+                        models.RaceStates.open.value,
+                        models.RaceStates.invitational.value,
+                    ],
                     then=1,
                 ),
                 # Pending/In progress
                 db_models.When(
-                    state=models.RaceStates.pending,
+                    state=models.RaceStates.pending.value,
                     then=2,
                 ),
                 db_models.When(
-                    state=models.RaceStates.in_progress,
+                    state=models.RaceStates.in_progress.value,
                     then=2,
                 ),
                 output_field=db_models.PositiveSmallIntegerField(),
@@ -54,23 +88,191 @@ class Category(UserMixin, generic.DetailView):
             ),
         ).order_by('state_sort', 'opened_at').all()
 
-    def past_races(self):
-        return self.object.race_set.filter(state__in=[
-            models.RaceStates.finished,
-        ]).order_by('-ended_at').all()[:100]
+    def past_races(self, before=None, goal=None, recorded=None):
+        """
+        Return a page of finished races, most recent first, along with the
+        cursor for the next page (None if there are no more races).
+
+        Pages are fetched by keyset on (ended_at, id) rather than by offset,
+        so every page costs the same however far back it is.
+        """
+        queryset = self.object.race_set.filter(
+            state=models.RaceStates.finished.value,
+            ended_at__isnull=False,
+        )
+        if before:
+            ended_at, race_id = before
+            queryset = queryset.filter(
+                db_models.Q(ended_at__lt=ended_at)
+                | db_models.Q(ended_at=ended_at, id__lt=race_id)
+            )
+        if goal:
+            queryset = queryset.filter(goal__name=goal)
+        if recorded is not None:
+            queryset = queryset.filter(recorded=recorded)
+
+        races = list(
+            queryset.with_summary().order_by(
+                '-ended_at', '-id',
+            )[:self.past_races_per_page + 1]
+        )
+        if len(races) > self.past_races_per_page:
+            races = races[:self.past_races_per_page]
+            return races, encode_cursor(races[-1])
+        return races, None
 
 
-class CategoryData(Category):
+class CategoryData(PayloadMixin, Category):
     def get(self, request, *args, **kwargs):
         self.object = self.get_object()
-        resp = HttpResponse(
-            content=self.object.json_data,
+        resp = self.payload_response(
+            self.object.slug + '/data',
+            lambda: self.object.json_data,
+        )
+        resp['X-Date-Exact'] = timezone.now().isoformat()
+        return resp
+
+
+class CategoryRaces(Category):
+    """
+    Browse all past races in a category, a page at a time.
+
+    Accepts the following query parameters:
+        before: cursor for the page to show, as given in the previous page.
+        goal: only show races for the named category goal.
+        recorded: "true" or "false" to filter on whether races were recorded.
+    """
+    template_name = 'racetime/category_races.html'
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        try:
+            self.filters = self.get_filters()
+        except ValueError as ex:
+            return HttpResponseBadRequest(str(ex))
+        self.races, self.next_cursor = self.past_races(**self.filters)
+        return self.render_races()
+
+    def get_context_data(self, **kwargs):
+        return {
+            **super(Category, self).get_context_data(**kwargs),
+            'can_moderate': self.object.can_moderate(self.user),
+            'goals': self.object.goal_set.order_by('name'),
+            'filters': self.filters,
+            'past_races': self.races,
+            'next_url': self.get_next_url(),
+        }
+
+    def get_filters(self):
+        filters = {
+            'before': None,
+            'goal': self.request.GET.get('goal') or None,
+            'recorded': None,
+        }
+
+        before = self.request.GET.get('before')
+        if before:
+            try:
+                filters['before'] = decode_cursor(before)
+            except (ValueError, OverflowError):
+                raise ValueError(
+                    'Unable to parse given cursor in "before" parameter.'
+                )
+
+        recorded = self.request.GET.get('recorded')
+        if recorded:
+            if recorded not in ('true', 'false'):
+                raise ValueError(
+                    'The "recorded" parameter must be "true" or "false".'
+                )
+            filters['recorded'] = recorded == 'true'
+
+        return filters
+
+    def get_next_url(self):
+        """
+        Return the URL of the next page of races, keeping the current
+        filters, or None if this is the last page.
+        """
+        if not self.next_cursor:
+            return None
+        params = self.request.GET.copy()
+        params['before'] = self.next_cursor
+        return self.request.path + '?' + params.urlencode()
+
+    def render_races(self):
+        return self.render_to_response(self.get_context_data())
+
+
+class CategoryRacesData(CategoryRaces):
+    def render_races(self):
+        return HttpResponse(
+            content=dump_past_races(self.races, self.get_next_url()),
             content_type='application/json',
         )
+
+
+class CategoryStats(Category):
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        resp = JsonResponse({
+            'name': self.object.name,
+            'slug': self.object.slug,
+            'goals': [
+                {
+                    'name': goal.name,
+                    'active': goal.active,
+                    **goal.stats,
+                }
+                for goal in self.object.goal_set.order_by('-active', 'name')
+            ],
+        })
         resp['X-Date-Exact'] = timezone.now().isoformat()
         return resp
 
 
+class CategoryLeaderboards(Category):
+    """
+    Show the leaderboard for one of the category's goals, chosen with the
+    "goal" query parameter (default: the first goal by name).
+    """
+    template_name = 'racetime/category_leaderboards.html'
+    # How many standings to show at once.
+    leaderboard_size = 100
+
+    def get_context_data(self, **kwargs):
+        goals = list(self.object.goal_set.order_by('-active', 'name'))
+        goal_name = self.request.GET.get('goal')
+        goal = next(
+            (goal for goal in goals if goal.name == goal_name),
+            goals[0] if goals else None,
+        )
+        return {
+            **super(Category, self).get_context_data(**kwargs),
+            'goals': goals,
+            'goal': goal,
+            'standings': self.standings(goal) if goal else [],
+        }
+
+    def standings(self, goal):
+        standings = list(models.LeaderboardEntry.objects.filter(
+            goal=goal,
+        ).select_related('user').order_by(
+            db_models.F('best_time').asc(nulls_last=True),
+            '-times_finished',
+            'user__name',
+        )[:self.leaderboard_size])
+
+        ratings = dict(models.Rating.objects.filter(
+            goal=goal,
+            user__in=[standing.user for standing in standings],
+        ).values_list('user_id', 'rating'))
+        for standing in standings:
+            standing.rating = ratings.get(standing.user_id)
+
+        return standings
+
+
 class RequestCategory(LoginRequiredMixin, UserMixin, generic.CreateView):
     form_class = forms.CategoryRequestForm
     model = models.CategoryRequest
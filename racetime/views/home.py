@@ -1,7 +1,7 @@
-from django.db.models import Count, Q
+from django.conf import settings
 from django.views import generic
 
-from ..models import Category, RaceStates
+from ..models import Category
 
 
 class Home(generic.TemplateView):
@@ -11,18 +11,12 @@ class Home(generic.TemplateView):
         context = super().get_context_data(**kwargs)
         context.update({
             'categories': self.categories(),
+            'cache_timeout': settings.RT_CACHE_TIMEOUT,
         })
         return context
 
     def categories(self):
         queryset = Category.objects.filter(active=True)
-        queryset = queryset.annotate(
-            current_race_count=Count(
-                expression='race__id',
-                filter=Q(race__state__in=[c.value for c in RaceStates.current]),
-            ),
-            total_race_count=Count(expression='race__id'),
-        )
         queryset = queryset.order_by(
             '-current_race_count',
             '-total_race_count',
@@ -1,17 +1,48 @@
 import dateutil.parser
+from django.contrib import messages
 from django.contrib.auth.mixins import UserPassesTestMixin
-from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, HttpResponseRedirect
+from django.http import HttpResponseBadRequest, JsonResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.views import generic
 
-from .base import CanMonitorRaceMixin, UserMixin
-from .. import forms, models
+from .base import CanMonitorRaceMixin, PayloadMixin, UserMixin, split_segments
+from .. import archive, forms, models
+from ..utils import SafeException
+
+
+class RaceArchiveMixin:
+    """
+    Serve GET requests from the race archive, if the race has been archived.
+
+    Segments that depend on the viewer are only served from the archive to
+    anonymous users.
+    """
+    archive_segment = None
+    archive_anonymous_only = False
+
+    def dispatch(self, request, *args, **kwargs):
+        if (
+            request.method == 'GET'
+            and self.archive_segment
+            and not (self.archive_anonymous_only and request.user.is_authenticated)
+        ):
+            resp = archive.serve(
+                request,
+                kwargs.get('category'),
+                kwargs.get('race'),
+                self.archive_segment,
+            )
+            if resp:
+                return resp
+        return super().dispatch(request, *args, **kwargs)
 
 
-class Race(UserMixin, generic.DetailView):
+class Race(RaceArchiveMixin, UserMixin, generic.DetailView):
     slug_url_kwarg = 'race'
     model = models.Race
+    archive_segment = 'page'
+    archive_anonymous_only = True
 
     def get_chat_form(self):
         return forms.ChatForm()
@@ -20,7 +51,7 @@ class Race(UserMixin, generic.DetailView):
         return forms.InviteForm()
 
     def get_context_data(self, **kwargs):
-        race = self.get_object()
+        race = self.object
         return {
             **super().get_context_data(**kwargs),
             'chat_form': self.get_chat_form(),
@@ -40,41 +71,70 @@ class Race(UserMixin, generic.DetailView):
         return queryset
 
 
-class RaceData(Race):
+class RaceData(PayloadMixin, Race):
+    archive_segment = 'data'
+    archive_anonymous_only = False
+
     def get(self, request, *args, **kwargs):
         self.object = self.get_object()
-        resp = HttpResponse(
-            content=self.object.json_data,
-            content_type='application/json',
+        resp = self.payload_response(
+            str(self.object) + '/data',
+            lambda: self.object.json_data,
         )
         resp['X-Date-Exact'] = timezone.now().isoformat()
         return resp
 
 
-class RaceRenders(Race):
+class RaceRenders(PayloadMixin, Race):
+    archive_segment = 'renders'
+    # The archived renders are the public ones, without monitor blocks.
+    archive_anonymous_only = True
+
     def get(self, request, *args, **kwargs):
         self.object = self.get_object()
-        if self.user.is_authenticated:
-            resp = JsonResponse(
-                self.object.get_renders(self.user, self.request)
+        segments = request.GET.get('segments')
+        if not self.user.is_authenticated and not segments:
+            resp = self.payload_response(
+                str(self.object) + '/renders',
+                lambda: self.object.json_renders,
             )
         else:
-            resp = HttpResponse(
-                content=self.object.json_renders,
-                content_type='application/json',
-            )
+            resp = JsonResponse(self.object.get_renders(
+                self.user,
+                self.request,
+                split_segments(segments),
+            ))
         resp['X-Date-Exact'] = timezone.now().isoformat()
         return resp
 
 
+class RaceState(Race):
+    archive_segment = 'state'
+    # The race state is the same for every viewer.
+    archive_anonymous_only = False
+
+    def get(self, request, *args, **kwargs):
+        now = timezone.now()
+        self.object = self.get_object()
+        resp = JsonResponse(
+            self.object.get_state_diff(request.GET.get('since'))
+        )
+        resp['X-Date-Exact'] = now.isoformat()
+        return resp
+
+
 class RaceChat(Race):
+    archive_segment = 'chat'
+    # Monitors can see deleted messages, which the archive leaves out.
+    archive_anonymous_only = True
+
     def get(self, request, *args, **kwargs):
         self.object = self.get_object()
 
         end = timezone.now()
         messages = self.object.message_set.filter(
             posted_at__lte=end,
-        ).order_by('-posted_at')
+        ).select_related('user').order_by('-posted_at')
 
         since = request.GET.get('since')
         if since:
@@ -96,21 +156,10 @@ class RaceChat(Race):
 
         return JsonResponse({
             'messages': [
-                {
-                    'id': message.hashid,
-                    'user': (
-                        message.user.api_dict_summary(race=self.object)
-                        if not message.user.is_system else None
-                    ),
-                    'posted_at': message.posted_at,
-                    'message': message.message,
-                    'highlight': message.highlight,
-                    'is_system': message.user.is_system,
-                    **({
-                        'deleted': message.deleted,
-                        'deleted_by': str(message.deleted_by),
-                    } if can_see_deleted else {}),
-                }
+                message.api_dict_summary(
+                    race=self.object,
+                    can_see_deleted=can_see_deleted,
+                )
                 for message in reversed(messages.all()[:100])
             ],
             'start': start,
@@ -174,6 +223,102 @@ class CreateRace(UserPassesTestMixin, UserMixin, RaceFormMixin, generic.CreateVi
         return self.get_category().can_start_race(self.user)
 
 
+class CreateRaceBatch(UserPassesTestMixin, UserMixin, RaceFormMixin, generic.FormView):
+    """
+    Open a batch of race rooms at once, for category moderators running a
+    tournament round. See Race.objects.bulk_open.
+
+    AJAX requests get back each race opened, with the users invited to it
+    and the users skipped along with the reason for each.
+    """
+    form_class = forms.RaceBatchForm
+    template_name = 'racetime/race_form.html'
+
+    def get_context_data(self, **kwargs):
+        return {
+            **super().get_context_data(**kwargs),
+            'batch': True,
+        }
+
+    def form_valid(self, form):
+        category = self.get_category()
+
+        fields = {
+            field: form.cleaned_data[field]
+            for field in forms.RaceCreationForm.Meta.fields
+            if field != 'invitational'
+        }
+        if form.cleaned_data.get('invitational'):
+            fields['state'] = models.RaceStates.invitational.value
+
+        try:
+            races, skipped = models.Race.objects.bulk_open(
+                category,
+                self.user,
+                form.cleaned_data['rooms'],
+                form.cleaned_data['monitors'],
+                **fields
+            )
+        except SafeException as ex:
+            form.add_error(None, str(ex))
+            return self.form_invalid(form)
+
+        if self.request.is_ajax():
+            return JsonResponse({
+                'races': [
+                    {
+                        'name': str(race),
+                        'url': race.get_absolute_url(),
+                        'invited': [
+                            str(user) for user in rooms
+                            if user not in skipped[race]
+                        ],
+                        'skipped': {
+                            str(user): reason
+                            for user, reason in skipped[race].items()
+                        },
+                    }
+                    for race, rooms in zip(races, form.cleaned_data['rooms'])
+                ],
+            })
+
+        messages.info(
+            self.request,
+            'Opened %(count)d race rooms: %(races)s'
+            % {
+                'count': len(races),
+                'races': ', '.join(race.slug for race in races),
+            },
+        )
+        for race in races:
+            if skipped[race]:
+                messages.warning(
+                    self.request,
+                    'Could not invite to %(race)s: %(skipped)s'
+                    % {
+                        'race': race.slug,
+                        'skipped': ', '.join(
+                            '%s (%s)' % (user, reason)
+                            for user, reason in skipped[race].items()
+                        ),
+                    },
+                )
+        return HttpResponseRedirect(category.get_absolute_url())
+
+    def form_invalid(self, form):
+        if self.request.is_ajax():
+            return JsonResponse(
+                {'errors': form.errors.get_json_data()},
+                status=422,
+            )
+        return super().form_invalid(form)
+
+    def test_func(self):
+        if not self.user.is_authenticated:
+            return False
+        return self.get_category().can_moderate(self.user)
+
+
 class EditRace(CanMonitorRaceMixin, UserMixin, RaceFormMixin, generic.UpdateView):
     form_class = forms.RaceEditForm
     model = models.Race
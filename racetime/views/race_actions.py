@@ -1,5 +1,3 @@
-from datetime import timedelta
-
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils import timezone
 from django.views import generic
@@ -29,7 +27,7 @@ class Message(RaceAction, generic.FormView):
             and (
                 race.recorded
                 or not race.recordable
-                or race.ended_at <= timezone.now() - timedelta(hours=1)
+                or race.ended_at <= timezone.now() - race.CHAT_WINDOW
             )
             and not self.user.is_superuser
         ):
@@ -1,6 +1,7 @@
 """
 Monitor actions (race):
     Invite user (inv)
+    Invite many users (open/inv)
     Close to new entrants (open/inv)
     Re-open to entrants (pending)
     Cancel race (any)
@@ -9,31 +10,45 @@ Monitor actions (per-user):
     Force ready/un-ready (open/inv/pending)
     Force quit (open/inv/pending)
     Disqualify (in_prog/finished)
+Monitor actions (bulk):
+    Accept invites, force un-ready or remove many entrants at once
 
 """
-from django.http import Http404
+from django.http import Http404, JsonResponse
 from django.views import generic
 
 from .base import BaseRaceAction, CanModerateRaceMixin, CanMonitorRaceMixin
-from ..forms import InviteForm
-from ..models import Entrant, User
+from ..forms import BulkInviteForm, InviteForm
+from ..models import Entrant
 from ..utils import SafeException
 
 
 class EntrantAction:
+    _entrant = None
+
     def action(self, race, entrant, user):
         raise NotImplementedError
 
     def get_entrant(self):
-        entrant_hashid = self.kwargs.get('entrant')
-
-        try:
-            return Entrant.objects.get(
-                user=User.objects.get_by_hashid(entrant_hashid),
-                race=self.get_race(),
-            )
-        except (Entrant.DoesNotExist, User.DoesNotExist):
-            raise Http404('No entrant matches the given query.')
+        """
+        Return the entrant being acted on, with its user loaded in the same
+        query.
+
+        The race and its category are loaded before this, by get_race, so
+        that permissions are checked before anything is revealed about who
+        has entered the race.
+        """
+        if not self._entrant:
+            race = self.get_race()
+            try:
+                self._entrant = Entrant.objects.select_related('user').get(
+                    race=race,
+                    user__hashid=self.kwargs.get('entrant'),
+                )
+            except Entrant.DoesNotExist:
+                raise Http404('No entrant matches the given query.')
+            self._entrant.race = race
+        return self._entrant
 
     def _do_action(self):
         self.action(self.get_race(), self.get_entrant(), self.user)
@@ -90,6 +105,44 @@ class InviteToRace(MonitorRaceAction, generic.FormView):
         race.invite(invite.user, user)
 
 
+class BulkInviteToRace(MonitorRaceAction, generic.FormView):
+    """
+    Invite a list of users, one "name#discriminator" per line in the
+    "users" field. AJAX requests get back the names of the users invited,
+    and the names of those skipped with the reason for each.
+    """
+    form_class = BulkInviteForm
+    invited = ()
+    skipped = {}
+
+    def action(self, race, user):
+        form = self.get_form()
+        if not form.is_valid():
+            raise SafeException(form.errors)
+
+        self.invited, self.skipped = race.bulk_invite(
+            form.cleaned_data['users'],
+            user,
+        )
+        if not self.invited:
+            raise SafeException(
+                'None of these users can be invited: %(skipped)s'
+                % {'skipped': ', '.join(
+                    '%s (%s)' % (user, reason)
+                    for user, reason in self.skipped.items()
+                )}
+            )
+
+    def ajax_response(self):
+        return JsonResponse({
+            'invited': [str(user) for user in self.invited],
+            'skipped': {
+                str(user): reason
+                for user, reason in self.skipped.items()
+            },
+        })
+
+
 class RecordRace(ModeratorRaceAction):
     def action(self, race, user):
         race.record(recorded_by=user)
@@ -110,7 +163,7 @@ class ForceUnready(MonitorEntrantAction):
         entrant.force_unready(forced_by=user)
 
 
-class OverrideStream(ModeratorRaceAction):
+class OverrideStream(ModeratorEntrantAction):
     def action(self, race, entrant, user):
         entrant.override_stream(overridden_by=user)
 
@@ -138,3 +191,15 @@ class AddMonitor(MonitorEntrantAction):
 class RemoveMonitor(MonitorEntrantAction):
     def action(self, race, entrant, user):
         race.remove_monitor(entrant.user, removed_by=user)
+
+
+class BulkEntrantAction(MonitorRaceAction):
+    """
+    Apply one entrant action to many entrants, given as a list of user
+    hashids in the "entrants" field. See Race.bulk_entrant_action.
+    """
+    def action(self, race, user):
+        entrants = self.request.POST.getlist('entrants')
+        if not entrants:
+            raise SafeException('No entrants were selected.')
+        race.bulk_entrant_action(self.kwargs.get('action'), entrants, user)
@@ -112,7 +112,9 @@ class EditAccount(LoginRequiredMixin, UserMixin, generic.FormView):
             form_kwargs['user'] = self.user
             post_button = 'change_password'
         if form_class == forms.UserEditForm:
-            form_kwargs['instance'] = self.user
+            # Edit a separate copy, so self.user keeps the details being
+            # replaced until the change has been logged.
+            form_kwargs['instance'] = models.User.objects.get(id=self.user.id)
             post_button = 'update_account'
 
         if self.request.method in ('POST', 'PUT') and post_button not in self.request.POST: